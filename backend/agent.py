@@ -12,24 +12,31 @@ Architecture:
 - Tool registry with typed parameters
 - Streaming response support
 - Context-aware conversation management
+- Response caching for repeated questions in the same conversation context
 
 Updated 2026-01-12: Switched from Anthropic to OpenRouter for model flexibility.
 """
 
 import asyncio
-import json
+import hashlib
 import logging
 import os
 import re
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
+import fastjsonschema
+import httpx
+import orjson
 from openai import AsyncOpenAI, APIError
 
+from cache import TTLCache
 from tools.replicate import ReplicateClient
 from tools.price_compare import PriceComparer
-from database import save_chat_message, get_chat_history, save_generated_image
+from database import save_chat_exchange, get_chat_history, save_generated_image
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +45,92 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 MODEL_NAME = os.getenv("OPENROUTER_MODEL", "anthropic/claude-sonnet-4")
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "4096"))
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
-
-DEMO_PRODUCT_CATALOG: List[Dict[str, Any]] = [
+# Optional cheaper model raced against MODEL_NAME for short, simple queries and
+# used as a fallback when the primary model errors. Empty disables both.
+FALLBACK_MODEL_NAME = os.getenv("OPENROUTER_FALLBACK_MODEL", "")
+SPECULATIVE_MAX_CHARS = int(os.getenv("SPECULATIVE_MAX_CHARS", "100"))
+OPENROUTER_TIMEOUT_SECONDS = float(os.getenv("OPENROUTER_TIMEOUT_SECONDS", "60"))
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "100"))
+
+# Conversation history sent to the LLM is capped by a turn count and an
+# estimated token budget
+MAX_HISTORY_TURNS = int(os.getenv("MAX_HISTORY_TURNS", "10"))
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", "2048"))
+CHARS_PER_TOKEN = 4
+
+# Prompt caching: providers only reuse a cached prefix when it is byte-identical,
+# so the system prompt and tool schemas must never vary between requests.
+PROMPT_CACHE_CONTROL = {"type": "ephemeral"}
+
+# Response cache: answers for equivalent messages in an equivalent conversation
+# are reused instead of making another LLM round-trip.
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_HISTORY_TURNS = 4
+# Tool-result cache: identical tool calls (after normalizing free-text
+# arguments) reuse the previous result instead of re-running the handler.
+TOOL_CACHE_TTL_SECONDS = int(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+TOOL_CACHE_MAX_RESULT_BYTES = 64 * 1024
+# compare_prices is left out: PriceComparer caches itself and flags its hits
+# with "cached"/"fetched_at", which a second cache layer would misreport
+CACHEABLE_TOOLS = ("search_products", "generate_image")
+# Tools whose handlers cache their own expensive step, so per-user side
+# effects (saving the generated image record) still run on a hit
+_HANDLER_CACHED_TOOLS = frozenset({"generate_image"})
+# Replicate calls are slow and billed per run, so generated images are kept longer
+IMAGE_CACHE_TTL_SECONDS = int(os.getenv("IMAGE_CACHE_TTL_SECONDS", "86400"))
+LLM_ERROR_MESSAGE = "I encountered an error processing your request. Please try again."
+
+# Fast routes: unambiguous single-tool requests are dispatched straight to
+# the tool handler without an LLM round-trip.
+_FAST_ROUTES: Tuple[Tuple["re.Pattern[str]", str], ...] = (
+    (
+        re.compile(r"^\s*compare\s+prices?(?:\s+(?:for|of|on))?\s+(?P<product_name>.+?)\s*[.?!]?\s*$", re.I),
+        "compare_prices",
+    ),
+    (
+        re.compile(
+            r"^\s*(?:generate|draw|make|create)\s+(?:an?\s+)?(?:image|picture)\s+(?:of\s+)?"
+            r"(?P<prompt>.+?)\s*[.?!]?\s*$",
+            re.I,
+        ),
+        "generate_image",
+    ),
+    (
+        re.compile(
+            r"^\s*(?:find|search(?:\s+for)?)\s+(?:me\s+)?"
+            # "find out how...", "search for the cheapest way..." are questions
+            r"(?!(?:for|out|how|where|why|what|when|who|which|whether|if)\b|the\s+\w+\s+way\b)"
+            r"(?P<query>.+?)"
+            r"(?:\s+under\s+\$?(?P<max_price>\d+(?:\.\d+)?))?\s*[.?!]?\s*$",
+            re.I,
+        ),
+        "search_products",
+    ),
+)
+_FAST_ROUTE_MESSAGES = {
+    "search_products": "Here are the matching products.",
+    "generate_image": "Here is the generated image.",
+    "compare_prices": "Here is the price comparison.",
+}
+
+_CACHE_STOPWORDS = frozenset({
+    "a", "an", "the", "me", "my", "i", "please", "can", "could", "you",
+    "would", "some", "for", "to", "of", "show", "give", "get",
+})
+
+# Search fast routes only take short, plain product queries; conjunctions,
+# comparisons and references to earlier turns need the LLM.
+_FAST_ROUTE_MAX_SEARCH_TERMS = 3
+_FAST_ROUTE_SEARCH_BLOCKERS = frozenset({
+    "and", "or", "but", "with", "vs", "versus", "than", "compare", "cheaper",
+    "better", "similar", "like", "likes", "last", "previous", "one", "ones",
+    "it", "them", "that", "those", "this", "these", "generate", "image",
+    "picture", "draw",
+})
+
+_DEMO_PRODUCTS: List[Dict[str, Any]] = [
     {
         "id": "demo_sneaker_001",
         "name": "Futuristic Runner Sneaker",
@@ -112,25 +203,90 @@ DEMO_PRODUCT_CATALOG: List[Dict[str, Any]] = [
     },
 ]
 
+# Read-only catalog plus its lowercased search text, built once at import
+DEMO_PRODUCT_CATALOG: Tuple[Mapping[str, Any], ...] = tuple(
+    MappingProxyType(product) for product in _DEMO_PRODUCTS
+)
+_DEMO_CATALOG_SEARCH_TEXT: Tuple[str, ...] = tuple(
+    f"{product['name']} {product['description']} {product['category']}".lower()
+    for product in DEMO_PRODUCT_CATALOG
+)
+# Shared metadata for streamed text chunks; read-only because it is reused
+_TEXT_METADATA: Mapping[str, str] = MappingProxyType({"type": "text"})
+_NO_PREFERENCES: Mapping[str, Any] = MappingProxyType({})
+MOCK_IMAGE_URL = "https://via.placeholder.com/512"
+
+# Streaming: text deltas are coalesced into frames of at least this many
+# characters; tool events and the end of the stream flush early.
+STREAM_TEXT_BATCH_CHARS = int(os.getenv("STREAM_TEXT_BATCH_CHARS", "64"))
+# A partial frame is flushed once its oldest delta has waited this long, so
+# slow models still stream visibly
+STREAM_TEXT_MAX_DELAY_SECONDS = float(os.getenv("STREAM_TEXT_MAX_DELAY_SECONDS", "0.05"))
+# Mock streaming (no API key): optional artificial pacing for UI demos
+MOCK_STREAM_DELAY = float(os.getenv("MOCK_STREAM_DELAY", "0"))
+MOCK_STREAM_CHUNK_SIZE = 128
+_UNAVAILABLE_COMPARISON: Mapping[str, Any] = MappingProxyType({
+    "best_deal": None,
+    "cached": False,
+    "evidence_status": "unavailable_no_retailer_integrations",
+    "message": "Live retailer price comparison is not implemented in this build.",
+})
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting prompts."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def trim_history(
+    history: List[Dict[str, str]],
+    max_tokens: int = MAX_HISTORY_TOKENS
+) -> List[Dict[str, str]]:
+    """
+    Keep the most recent history turns that fit within max_tokens.
+
+    Turns are taken newest-first until the budget is exhausted, so prompt
+    size is bounded by the budget rather than by session length.
+    """
+    used = 0
+    start = len(history)
+    for index in range(len(history) - 1, -1, -1):
+        used += estimate_tokens(history[index].get("content") or "")
+        if used > max_tokens:
+            break
+        start = index
+    return history[start:]
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Tool:
-    """Definition of an agent tool."""
+    """Definition of an agent tool (immutable once registered)."""
     name: str
     description: str
     parameters: Dict[str, Any]
     handler: Callable
     requires_auth: bool = False
+    validator: Optional[Callable[[Dict[str, Any]], Any]] = field(default=None, repr=False, compare=False)
+    required: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Compile the parameter schema once; validating LLM-supplied
+        # arguments is then a call into generated code
+        if self.validator is None:
+            object.__setattr__(self, "validator", fastjsonschema.compile(self.parameters))
+        object.__setattr__(self, "required", tuple(self.parameters.get("required", ())))
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentContext:
     """Context for agent conversations."""
     user_id: str
     session_id: Optional[int] = None
     wallet_address: Optional[str] = None
-    preferences: Dict[str, Any] = field(default_factory=dict)
-    history: List[Dict[str, str]] = field(default_factory=list)
+    # Callers pass the shared empty mapping when there are no preferences;
+    # mappingproxy is not an allowed dataclass default before Python 3.12
+    preferences: Mapping[str, Any] = field(default_factory=dict)
+    history: Sequence[Dict[str, str]] = ()
     last_message: Optional[str] = None  # Used as fallback for tool args
 
 
@@ -168,9 +324,34 @@ Tool usage:
 
     def __init__(self):
         self.client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
         self.replicate: Optional[ReplicateClient] = None
         self.price_comparer: Optional[PriceComparer] = None
         self.tools: List[Tool] = []
+        self._tools_by_name: Dict[str, Tool] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+        self.response_cache = TTLCache(
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+        )
+        self.tool_caches: Dict[str, TTLCache] = {
+            name: TTLCache(max_entries=TOOL_CACHE_MAX_ENTRIES, ttl_seconds=TOOL_CACHE_TTL_SECONDS)
+            for name in CACHEABLE_TOOLS
+        }
+        self.tool_caches["generate_image"] = TTLCache(
+            max_entries=TOOL_CACHE_MAX_ENTRIES,
+            ttl_seconds=IMAGE_CACHE_TTL_SECONDS,
+        )
+        # Tool name -> function merging that tool's result into a chat response
+        self._result_reducers: Dict[str, Callable[[Dict[str, Any], Dict[str, Any], Any], None]] = {
+            "search_products": self._reduce_search_result,
+            "generate_image": self._reduce_image_result,
+            "compare_prices": self._reduce_price_result,
+        }
+        self.fast_route_hits = 0
+        self._system_message = self._build_system_message()
+        self._completion_kwargs = self._build_completion_kwargs()
+        self._fallback_completion_kwargs = self._build_completion_kwargs(FALLBACK_MODEL_NAME)
         self._initialized = False
 
     async def initialize(self):
@@ -182,13 +363,24 @@ Tool usage:
 
         # Initialize OpenRouter client (OpenAI-compatible API)
         if OPENROUTER_API_KEY:
+            # Shared pooled HTTP/2 client: concurrent chats and streams reuse
+            # warm connections instead of paying a TLS handshake per request
+            self._http_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=OPENROUTER_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENROUTER_MAX_CONNECTIONS // 2,
+                ),
+                timeout=httpx.Timeout(OPENROUTER_TIMEOUT_SECONDS, connect=5.0),
+            )
             self.client = AsyncOpenAI(
                 api_key=OPENROUTER_API_KEY,
                 base_url=OPENROUTER_BASE_URL,
                 default_headers={
                     "HTTP-Referer": "https://agentic-commerce-arc.railway.app",
                     "X-Title": "Agentic Commerce on Arc"
-                }
+                },
+                http_client=self._http_client,
             )
             logger.info(f"OpenRouter client initialized with model: {MODEL_NAME}")
         else:
@@ -206,6 +398,59 @@ Tool usage:
         self._initialized = True
         logger.info("Commerce Agent initialized successfully")
 
+    def _build_system_message(self) -> Dict[str, Any]:
+        """
+        Build the static system message that prefixes every LLM request.
+
+        Per-user or per-request data must never be added here: any change to
+        the prefix invalidates the provider-side prompt cache. Anthropic models
+        get an explicit cache breakpoint, which OpenRouter forwards upstream.
+        """
+        if MODEL_NAME.startswith("anthropic/"):
+            return {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": self.SYSTEM_PROMPT,
+                        "cache_control": PROMPT_CACHE_CONTROL,
+                    }
+                ],
+            }
+        return {"role": "system", "content": self.SYSTEM_PROMPT}
+
+    @staticmethod
+    def _mark_history_cache_breakpoint(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Put a prompt-cache breakpoint on the newest history turn.
+
+        The conversation so far is a stable prefix for the next request in the
+        session, so Anthropic models can reuse it instead of re-reading every
+        turn. History rows are shared, so the marked turn is copied.
+        """
+        if not MODEL_NAME.startswith("anthropic/"):
+            return history
+        last = history[-1]
+        marked = {
+            "role": last["role"],
+            "content": [
+                {
+                    "type": "text",
+                    "text": last["content"],
+                    "cache_control": PROMPT_CACHE_CONTROL,
+                }
+            ],
+        }
+        return [*history[:-1], marked]
+
+    def _build_completion_kwargs(self, model: str = MODEL_NAME) -> Dict[str, Any]:
+        """Request arguments shared by every chat completion call."""
+        return {
+            "model": model,
+            "max_tokens": MAX_TOKENS,
+            "tools": self._openai_tools_schema or None,
+        }
+
     def _register_tools(self):
         """Register available tools."""
         self.tools = [
@@ -292,9 +537,17 @@ Tool usage:
                 handler=self._handle_compare_prices
             ),
         ]
+        self._tools_by_name = {tool.name: tool for tool in self.tools}
+
+        # Drop schemas memoized for the previous tool list
+        self.__dict__.pop("_tools_schema", None)
+        self.__dict__.pop("_openai_tools_schema", None)
+        self._completion_kwargs = self._build_completion_kwargs()
+        self._fallback_completion_kwargs = self._build_completion_kwargs(FALLBACK_MODEL_NAME)
 
-    def _get_tools_schema(self) -> List[Dict[str, Any]]:
-        """Get tools in Anthropic API format."""
+    @cached_property
+    def _tools_schema(self) -> List[Dict[str, Any]]:
+        """Tools in Anthropic API format, built once per registration."""
         return [
             {
                 "name": tool.name,
@@ -304,6 +557,31 @@ Tool usage:
             for tool in self.tools
         ]
 
+    @staticmethod
+    def _reduce_search_result(result: Dict[str, Any], tool_args: Dict[str, Any], tool_result: Any):
+        result["products"] = tool_result
+        result["actions"].append({
+            "type": "search",
+            "query": tool_args.get("query")
+        })
+
+    @staticmethod
+    def _reduce_image_result(result: Dict[str, Any], tool_args: Dict[str, Any], tool_result: Any):
+        result["images"].append(tool_result)
+        result["actions"].append({
+            "type": "generate_image",
+            "prompt": tool_args.get("prompt")
+        })
+
+    @staticmethod
+    def _reduce_price_result(result: Dict[str, Any], tool_args: Dict[str, Any], tool_result: Any):
+        result["message"].append("\n\nPrice Comparison:\n")
+        result["message"].append(orjson.dumps(tool_result, option=orjson.OPT_INDENT_2).decode())
+        result["actions"].append({
+            "type": "compare_prices",
+            "product": tool_args.get("product_name")
+        })
+
     async def _handle_search_products(
         self,
         query: str,
@@ -327,37 +605,35 @@ Tool usage:
         normalized_sort = sort_by if sort_by in {"relevance", "price_asc", "price_desc", "rating"} else "relevance"
         query_terms = [term.lower() for term in re.findall(r"\w+", query or "")]
 
-        scored_products: List[tuple[int, Dict[str, Any]]] = []
-        for product in DEMO_PRODUCT_CATALOG:
-            if category and product["category"].lower() != category.lower():
+        category_filter = category.lower() if category else None
+        low = min_price if min_price is not None else float("-inf")
+        high = max_price if max_price is not None else float("inf")
+
+        # Single pass: category, price and relevance filters together
+        scored_products: List[tuple[int, Mapping[str, Any]]] = []
+        for product, searchable in zip(DEMO_PRODUCT_CATALOG, _DEMO_CATALOG_SEARCH_TEXT):
+            if category_filter and product["category"].lower() != category_filter:
+                continue
+            if not low <= product["price"] <= high:
                 continue
 
-            searchable = f"{product['name']} {product['description']} {product['category']}".lower()
             relevance = sum(1 for term in query_terms if term in searchable)
             if query_terms and relevance == 0:
                 continue
 
-            scored_products.append((relevance, dict(product)))
-
-        products = [product for _, product in scored_products]
-
-        # Apply price filters
-        if min_price is not None:
-            products = [p for p in products if p["price"] >= min_price]
-        if max_price is not None:
-            products = [p for p in products if p["price"] <= max_price]
+            scored_products.append((relevance, product))
 
         if normalized_sort == "price_asc":
-            products.sort(key=lambda p: (p["price"], p["name"]))
+            scored_products.sort(key=lambda sp: (sp[1]["price"], sp[1]["name"]))
         elif normalized_sort == "price_desc":
-            products.sort(key=lambda p: (-p["price"], p["name"]))
+            scored_products.sort(key=lambda sp: (-sp[1]["price"], sp[1]["name"]))
         elif normalized_sort == "rating":
-            products.sort(key=lambda p: (-(p.get("rating") or 0), p["name"]))
+            scored_products.sort(key=lambda sp: (-(sp[1].get("rating") or 0), sp[1]["name"]))
         else:
-            relevance_by_id = {product["id"]: score for score, product in scored_products}
-            products.sort(key=lambda p: (-relevance_by_id[p["id"]], p["name"]))
+            scored_products.sort(key=lambda sp: (-sp[0], sp[1]["name"]))
 
-        return products[:limit]
+        # Only the returned products are copied out of the frozen catalog
+        return [dict(product) for _, product in scored_products[:limit]]
 
     async def _handle_generate_image(
         self,
@@ -376,15 +652,14 @@ Tool usage:
                 "image_url": None,
                 "prompt": prompt
             }
-        logger.info(f"Generating image: prompt={prompt[:50]}..., style={style}")
+        # Renders are shared across users; the record below is saved per user
+        result = await self._run_cached(
+            "generate_image",
+            {"prompt": prompt, "style": style, "aspect_ratio": aspect_ratio},
+            lambda: self._render_image(prompt, style, aspect_ratio),
+        )
 
         if self.replicate:
-            result = await self.replicate.generate_image(
-                prompt=prompt,
-                style=style,
-                aspect_ratio=aspect_ratio
-            )
-
             # Save to database if user_id provided (non-blocking)
             # Note: user_id may be a wallet address (string) or integer ID
             if user_id and result.get("image_url"):
@@ -401,15 +676,25 @@ Tool usage:
                     # Log but don't fail - image was generated successfully
                     logger.warning(f"Failed to save image to database: {db_err}")
 
-            return result
-        else:
-            # Mock response if Replicate not configured
-            return {
-                "image_url": "https://via.placeholder.com/512",
-                "prompt": prompt,
-                "style": style,
-                "model": "mock"
-            }
+        return result
+
+    async def _render_image(self, prompt: str, style: str, aspect_ratio: str) -> Dict[str, Any]:
+        """Generate an image with Replicate, or a mock when it is not configured."""
+        logger.info(f"Generating image: prompt={prompt[:50]}..., style={style}")
+
+        if self.replicate:
+            return await self.replicate.generate_image(
+                prompt=prompt,
+                style=style,
+                aspect_ratio=aspect_ratio
+            )
+        # Mock response if Replicate not configured
+        return {
+            "image_url": MOCK_IMAGE_URL,
+            "prompt": prompt,
+            "style": style,
+            "model": "mock"
+        }
 
     async def _handle_compare_prices(
         self,
@@ -427,14 +712,11 @@ Tool usage:
             )
         else:
             return {
+                **_UNAVAILABLE_COMPARISON,
                 "product_name": product_name,
                 "product_id": product_id,
                 "sources": [],
-                "best_deal": None,
                 "fetched_at": datetime.utcnow().isoformat(),
-                "cached": False,
-                "evidence_status": "unavailable_no_retailer_integrations",
-                "message": "Live retailer price comparison is not implemented in this build.",
             }
 
     async def _execute_tool(
@@ -444,13 +726,12 @@ Tool usage:
         context: Optional[AgentContext] = None
     ) -> Any:
         """Execute a tool by name."""
-        tool = next((t for t in self.tools if t.name == tool_name), None)
+        tool = self._tools_by_name.get(tool_name)
         if not tool:
             raise ValueError(f"Unknown tool: {tool_name}")
 
         # Validate required parameters before execution
-        required_params = tool.parameters.get("required", [])
-        missing_params = [p for p in required_params if p not in tool_input]
+        missing_params = [p for p in tool.required if p not in tool_input]
         if missing_params:
             logger.warning(
                 f"Tool {tool_name} missing required params: {missing_params}. "
@@ -458,11 +739,77 @@ Tool usage:
             )
             return {"error": f"Missing required parameters: {missing_params}"}
 
-        # Add context info to tool input
-        if context:
-            tool_input["user_id"] = context.user_id
+        try:
+            tool.validator(tool_input)
+        except fastjsonschema.JsonSchemaValueException as e:
+            logger.warning(f"Tool {tool_name} received invalid params: {e.message}")
+            return {"error": f"Invalid parameters: {e.message}"}
+
+        # Add context info to the handler's copy of the input; the cache key
+        # leaves user_id out so results are shared across users for
+        # identical requests.
+        handler_input = {**tool_input, "user_id": context.user_id} if context else tool_input
+        if tool_name in _HANDLER_CACHED_TOOLS:
+            return await tool.handler(**handler_input)
+        return await self._run_cached(tool_name, tool_input, lambda: tool.handler(**handler_input))
+
+    async def _run_cached(
+        self,
+        tool_name: str,
+        tool_input: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Serve a tool call from its cache, awaiting call() on a miss.
+
+        Results are stored encoded, so every hit decodes a fresh copy that
+        callers may mutate without touching the cache.
+        """
+        cache = self.tool_caches.get(tool_name)
+        cache_key = self._tool_cache_key(tool_name, tool_input) if cache is not None else None
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return orjson.loads(cached)
+
+        result = await call()
+        if cache_key is not None:
+            encoded = self._encode_cacheable_result(result)
+            if encoded is not None:
+                cache.set(cache_key, encoded)
+        return result
+
+    @staticmethod
+    def _tool_cache_key(tool_name: str, tool_input: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Build a canonical cache key for a tool call.
+
+        Free-text arguments are lowercased and whitespace-collapsed so trivially
+        different phrasings of the same query share an entry.
+        """
+        normalized = {
+            key: " ".join(value.lower().split()) if isinstance(value, str) else value
+            for key, value in tool_input.items()
+        }
+        try:
+            return tool_name.encode() + b"|" + orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
+
+    @staticmethod
+    def _encode_cacheable_result(result: Any) -> Optional[bytes]:
+        """Encode a successful result small enough to keep in memory, else None."""
+        if isinstance(result, dict) and result.get("error"):
+            return None
+        try:
+            encoded = orjson.dumps(result)
+        except TypeError:
+            return None
+        return encoded if len(encoded) <= TOOL_CACHE_MAX_RESULT_BYTES else None
 
-        return await tool.handler(**tool_input)
+    def tool_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return per-tool cache hit/miss counters."""
+        return {name: cache.stats() for name, cache in self.tool_caches.items()}
 
     async def process_message(
         self,
@@ -486,24 +833,44 @@ Tool usage:
         agent_context = AgentContext(
             user_id=user_id,
             session_id=session_id,
-            preferences=context or {}
+            preferences=context or _NO_PREFERENCES
         )
 
         # Get chat history if session exists
         if session_id:
-            history = await get_chat_history(session_id, limit=10)
-            agent_context.history = [
-                {"role": msg["role"], "content": msg["content"]}
-                for msg in history
-            ]
-
-        # Build messages
-        messages = agent_context.history + [{"role": "user", "content": message}]
-
-        # Call LLM via OpenRouter
-        if self.client:
-            response = await self._call_llm(messages, agent_context)
+            # Rows already come back as {"role", "content"} message dicts
+            history = await get_chat_history(session_id, limit=MAX_HISTORY_TURNS)
+            agent_context.history = trim_history(history)
+
+        # Build messages (stateless requests have no history to prepend)
+        user_message = {"role": "user", "content": message}
+        if agent_context.history:
+            messages = [*self._mark_history_cache_breakpoint(agent_context.history), user_message]
         else:
+            messages = [user_message]
+
+        # Unambiguous first-turn requests skip the LLM entirely; follow-ups
+        # may depend on history, so they always go through the model
+        route = None if agent_context.history else self._fast_route(message)
+        response = await self._run_fast_route(*route, agent_context) if route else None
+        # Call LLM via OpenRouter, reusing a cached answer when possible
+        if response is None and self.client:
+            cache_key = self._response_cache_key(
+                message, agent_context.history, user_id, agent_context.preferences
+            )
+            cached = self.response_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                logger.debug("Response cache hit for user %s", user_id)
+                # Stored encoded, so nested products/images are fresh copies
+                response = orjson.loads(cached)
+            else:
+                response = await self._call_llm(messages, agent_context)
+                if cache_key is not None and self._is_cacheable_response(response):
+                    try:
+                        self.response_cache.set(cache_key, orjson.dumps(response))
+                    except TypeError:
+                        pass
+        elif response is None:
             # Mock response
             response = {
                 "message": f"I received your message about: {message[:100]}... However, the AI service is not configured. Please set up OPENROUTER_API_KEY.",
@@ -512,13 +879,97 @@ Tool usage:
                 "images": []
             }
 
-        # Save messages to database
+        # Save messages to database off the response path
         if session_id:
-            await save_chat_message(session_id, "user", message)
-            await save_chat_message(session_id, "assistant", response["message"])
+            self._run_in_background(
+                self._save_exchange(session_id, message, response["message"])
+            )
 
         return response
 
+    @classmethod
+    def _fast_route(cls, message: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Match a message against the direct-dispatch patterns."""
+        for pattern, tool_name in _FAST_ROUTES:
+            match = pattern.match(message)
+            if match:
+                tool_args = {key: value for key, value in match.groupdict().items() if value}
+                if tool_name == "search_products":
+                    query = cls._fast_route_search_query(tool_args["query"])
+                    if query is None:
+                        return None
+                    tool_args["query"] = query
+                if "max_price" in tool_args:
+                    tool_args["max_price"] = float(tool_args["max_price"])
+                return tool_name, tool_args
+        return None
+
+    @staticmethod
+    def _fast_route_search_query(query: str) -> Optional[str]:
+        """
+        Reduce a fast-routed search to its content words.
+
+        Returns None unless the query is a few plain words that each match
+        the catalog, so anything vaguer or multi-intent goes to the LLM.
+        """
+        terms = [
+            term for term in re.findall(r"\w+", query.lower())
+            if term not in _CACHE_STOPWORDS
+        ]
+        if not terms or len(terms) > _FAST_ROUTE_MAX_SEARCH_TERMS:
+            return None
+        if any(term in _FAST_ROUTE_SEARCH_BLOCKERS for term in terms):
+            return None
+        if not all(
+            any(term in searchable for searchable in _DEMO_CATALOG_SEARCH_TEXT)
+            for term in terms
+        ):
+            return None
+        return " ".join(terms)
+
+    async def _run_fast_route(
+        self,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        context: AgentContext
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Execute a fast-routed tool call and shape it like an LLM response.
+
+        Returns None when a search finds nothing, so the message falls
+        through to the LLM in case it was not a product query after all.
+        """
+        logger.debug(f"Fast route: {tool_name} {tool_args}")
+
+        tool_result = await self._execute_tool(tool_name, dict(tool_args), context)
+        if tool_name == "search_products" and not tool_result:
+            return None
+        self.fast_route_hits += 1
+        result = {
+            "message": [_FAST_ROUTE_MESSAGES[tool_name]],
+            "actions": [],
+            "products": [],
+            "images": []
+        }
+        if isinstance(tool_result, dict) and tool_result.get("error"):
+            result["message"] = [f"Sorry, I couldn't complete that request: {tool_result['error']}"]
+        self._result_reducers[tool_name](result, tool_args, tool_result)
+        result["message"] = "".join(result["message"])
+        return result
+
+    async def _save_exchange(self, session_id: int, message: str, reply: str) -> None:
+        """Persist a user/assistant exchange in order, in one transaction."""
+        try:
+            await save_chat_exchange(session_id, message, reply)
+        except Exception as e:
+            logger.error(f"Failed to save chat messages for session {session_id}: {e}")
+
+    def _run_in_background(self, coro) -> None:
+        """Schedule a coroutine, keeping a reference until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
     async def _call_llm(
         self,
         messages: List[Dict[str, str]],
@@ -526,24 +977,18 @@ Tool usage:
     ) -> Dict[str, Any]:
         """Call OpenRouter API with tools."""
         try:
-            # Convert tools to OpenAI function format
-            tools_schema = self._get_openai_tools_schema()
+            # Build messages behind the static (cacheable) system prefix
+            full_messages = [self._system_message, *messages]
 
-            # Build messages with system prompt
-            full_messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT}
-            ] + messages
-
-            response = await self.client.chat.completions.create(
-                model=MODEL_NAME,
-                max_tokens=MAX_TOKENS,
-                messages=full_messages,
-                tools=tools_schema if tools_schema else None
+            user_message = messages[-1].get("content", "") if messages else ""
+            response = await self._create_completion(
+                full_messages,
+                speculative=self._is_simple_query(user_message),
             )
 
-            # Process response
+            # Process response; message parts are joined once at the end
             result = {
-                "message": "",
+                "message": [],
                 "actions": [],
                 "products": [],
                 "images": []
@@ -552,51 +997,54 @@ Tool usage:
             # Handle response content
             choice = response.choices[0]
             if choice.message.content:
-                result["message"] = choice.message.content
+                result["message"].append(choice.message.content)
 
             # Handle tool calls (OpenAI format)
             if choice.message.tool_calls:
+                parsed_calls: List[tuple[str, Dict[str, Any]]] = []
                 for tool_call in choice.message.tool_calls:
                     tool_name = tool_call.function.name
 
                     # Safely parse tool arguments with error handling
                     try:
-                        tool_args = json.loads(tool_call.function.arguments)
-                    except json.JSONDecodeError as e:
+                        tool_args = orjson.loads(tool_call.function.arguments)
+                    except orjson.JSONDecodeError as e:
                         logger.error(
                             f"Failed to parse tool arguments for {tool_name}: {e}. "
                             f"Raw args: {tool_call.function.arguments[:200]}"
                         )
                         # Return error instead of crashing
-                        result["message"] = f"Error processing tool call: invalid arguments for {tool_name}"
+                        result["message"] = [f"Error processing tool call: invalid arguments for {tool_name}"]
                         continue
-
-                    # Execute tool
-                    tool_result = await self._execute_tool(
-                        tool_name,
-                        tool_args,
-                        context
-                    )
-
-                    # Add to appropriate result list
-                    if tool_name == "search_products":
-                        result["products"] = tool_result
-                        result["actions"].append({
-                            "type": "search",
-                            "query": tool_args.get("query")
-                        })
-                    elif tool_name == "generate_image":
-                        result["images"].append(tool_result)
-                        result["actions"].append({
-                            "type": "generate_image",
-                            "prompt": tool_args.get("prompt")
-                        })
-                    elif tool_name == "compare_prices":
-                        result["message"] += f"\n\nPrice Comparison:\n{json.dumps(tool_result, indent=2)}"
-                        result["actions"].append({
-                            "type": "compare_prices",
-                            "product": tool_args.get("product_name")
-                        })
+                    parsed_calls.append((tool_name, tool_args))
+
+                # Execute tools concurrently; results keep the call order.
+                # A single call (the common case) skips gather's task overhead.
+                # Failures come back as exceptions rather than propagating, so
+                # one bad call cannot abort the gather and orphan its siblings.
+                if len(parsed_calls) == 1:
+                    tool_name, tool_args = parsed_calls[0]
+                    try:
+                        tool_results = [await self._execute_tool(tool_name, tool_args, context)]
+                    except Exception as exc:
+                        tool_results = [exc]
+                else:
+                    tool_results = await asyncio.gather(*(
+                        self._execute_tool(tool_name, tool_args, context)
+                        for tool_name, tool_args in parsed_calls
+                    ), return_exceptions=True)
+
+                for (tool_name, tool_args), tool_result in zip(parsed_calls, tool_results):
+                    if isinstance(tool_result, BaseException):
+                        logger.error("Tool execution failed: %s", tool_result)
+                        result["message"].append(
+                            f"\n\nSorry, {tool_name} failed: {tool_result}"
+                        )
+                        continue
+                    # Merge into the appropriate result fields
+                    reducer = self._result_reducers.get(tool_name)
+                    if reducer:
+                        reducer(result, tool_args, tool_result)
 
             # Fallback: force image generation for short product-like prompts
             if not choice.message.tool_calls:
@@ -612,19 +1060,129 @@ Tool usage:
                         "prompt": user_message
                     })
 
+            result["message"] = "".join(result["message"])
             return result
 
         except APIError as e:
             logger.error(f"OpenRouter API error: {e}")
             return {
-                "message": "I encountered an error processing your request. Please try again.",
+                "message": LLM_ERROR_MESSAGE,
                 "actions": [],
                 "products": [],
                 "images": []
             }
 
-    def _get_openai_tools_schema(self) -> List[Dict[str, Any]]:
-        """Convert tools to OpenAI function calling format."""
+    async def _create_completion(
+        self,
+        full_messages: List[Dict[str, Any]],
+        speculative: bool = False
+    ) -> Any:
+        """
+        Create a chat completion, optionally racing the fallback model.
+
+        With FALLBACK_MODEL_NAME set, speculative requests start the primary
+        and fallback models together and keep whichever succeeds first; other
+        requests only use the fallback when the primary raises APIError.
+        """
+        if not FALLBACK_MODEL_NAME:
+            return await self.client.chat.completions.create(
+                messages=full_messages,
+                **self._completion_kwargs
+            )
+
+        if not speculative:
+            try:
+                return await self.client.chat.completions.create(
+                    messages=full_messages,
+                    **self._completion_kwargs
+                )
+            except APIError as e:
+                logger.warning(f"Primary model failed, retrying with {FALLBACK_MODEL_NAME}: {e}")
+                return await self.client.chat.completions.create(
+                    messages=full_messages,
+                    **self._fallback_completion_kwargs
+                )
+
+        pending = {
+            asyncio.create_task(self.client.chat.completions.create(
+                messages=full_messages, **self._completion_kwargs
+            )),
+            asyncio.create_task(self.client.chat.completions.create(
+                messages=full_messages, **self._fallback_completion_kwargs
+            )),
+        }
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # Cancel the slower model so it stops consuming tokens
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _is_simple_query(message: str) -> bool:
+        """Heuristic for short conversational queries worth racing two models on."""
+        text = message.strip().lower()
+        if not text or len(text) > SPECULATIVE_MAX_CHARS:
+            return False
+        tool_hints = ("search", "find", "compare", "price", "image", "generate", "escrow", "buy")
+        return not any(hint in text for hint in tool_hints)
+
+    @staticmethod
+    def _response_cache_key(
+        message: str,
+        history: Sequence[Dict[str, str]],
+        user_id: str,
+        preferences: Mapping[str, Any],
+    ) -> Optional[str]:
+        """
+        Build a response-cache key from the message and recent conversation.
+
+        The message is reduced to its lowercase content words so trivially
+        rephrased questions share an entry; the last few history turns and
+        the request context are hashed so a hit is only served within an
+        equivalent conversation. Entries are scoped to the user because
+        responses carry tool output (products, generated images) that was
+        produced for them. Returns None when the context cannot be encoded.
+        """
+        terms = [
+            term for term in re.findall(r"\w+", message.lower())
+            if term not in _CACHE_STOPWORDS
+        ]
+        context_hash = hashlib.sha256()
+        for turn in history[-RESPONSE_CACHE_HISTORY_TURNS:]:
+            turn_text = f"{turn.get('role') or ''}\x1f{turn.get('content') or ''}"
+            context_hash.update(hashlib.sha256(turn_text.encode("utf-8")).digest())
+        if preferences:
+            try:
+                context_hash.update(orjson.dumps(dict(preferences), option=orjson.OPT_SORT_KEYS))
+            except TypeError:
+                return None
+        return f"{user_id}|{' '.join(terms)}|{context_hash.hexdigest()}"
+
+    @staticmethod
+    def _is_cacheable_response(response: Dict[str, Any]) -> bool:
+        """Only cache successful responses; errors should be retried."""
+        if response.get("message") == LLM_ERROR_MESSAGE:
+            return False
+        return not any(
+            isinstance(image, dict) and image.get("error")
+            for image in response.get("images", [])
+        )
+
+    @cached_property
+    def _openai_tools_schema(self) -> List[Dict[str, Any]]:
+        """Tools in OpenAI function calling format, built once per registration.
+
+        Tools are sorted by name so the serialized schema, which follows the
+        system prompt in the cached prefix, is identical on every request.
+        """
         return [
             {
                 "type": "function",
@@ -634,7 +1192,7 @@ Tool usage:
                     "parameters": tool.parameters
                 }
             }
-            for tool in self.tools
+            for tool in sorted(self.tools, key=lambda t: t.name)
         ]
 
     async def stream_response(
@@ -650,7 +1208,7 @@ Tool usage:
         """
         agent_context = AgentContext(
             user_id=user_id,
-            preferences=context or {},
+            preferences=context or _NO_PREFERENCES,
             last_message=message  # Store for fallback in tool execution
         )
 
@@ -668,43 +1226,88 @@ Tool usage:
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """Yield a mock streaming response."""
         mock_response = f"Processing your request: {message[:50]}..."
-        for i in range(0, len(mock_response), 10):
+        for i in range(0, len(mock_response), MOCK_STREAM_CHUNK_SIZE):
             yield {
-                "content": mock_response[i:i + 10],
-                "metadata": {"type": "text"}
+                "content": mock_response[i:i + MOCK_STREAM_CHUNK_SIZE],
+                "metadata": _TEXT_METADATA
             }
-            await asyncio.sleep(0.1)
+            if MOCK_STREAM_DELAY:
+                await asyncio.sleep(MOCK_STREAM_DELAY)
 
     async def _stream_openrouter(
         self,
         message: str,
         context: AgentContext
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Stream OpenRouter response with tool execution."""
+        """
+        Stream OpenRouter response with tool execution.
+
+        Each tool starts as soon as its streamed arguments form a complete JSON
+        object, and its result is yielded while the model is still streaming,
+        so tool latency overlaps with token generation.
+        """
         messages = [{"role": "user", "content": message}]
-        tool_calls: Dict[str, Dict[str, str]] = {}
+        tool_calls: Dict[str, Dict[str, Any]] = {}
+        tool_tasks: Dict[str, tuple[str, asyncio.Task]] = {}
+        pending_text: List[str] = []
+        pending_chars = 0
+        loop = asyncio.get_running_loop()
+        flush_deadline = 0.0
+        next_chunk: Optional[asyncio.Future] = None
 
         try:
             stream = await self.client.chat.completions.create(
-                model=MODEL_NAME,
-                max_tokens=MAX_TOKENS,
-                messages=[{"role": "system", "content": self.SYSTEM_PROMPT}] + messages,
-                tools=self._get_openai_tools_schema() or None,
-                stream=True
+                messages=[self._system_message, *messages],
+                stream=True,
+                **self._completion_kwargs
             )
 
-            async for chunk in stream:
+            chunks = stream.__aiter__()
+            while True:
+                if next_chunk is None:
+                    next_chunk = asyncio.ensure_future(chunks.__anext__())
+                if pending_text:
+                    # Wait for the next delta only until the buffered text is
+                    # due; the fetch is kept, not cancelled, on timeout
+                    done, _ = await asyncio.wait(
+                        {next_chunk}, timeout=max(flush_deadline - loop.time(), 0)
+                    )
+                    if not done:
+                        yield self._text_chunk(pending_text)
+                        pending_chars = 0
+                        continue
+                try:
+                    chunk = await next_chunk
+                except StopAsyncIteration:
+                    break
+                finally:
+                    next_chunk = None
+
+                finished = self._drain_finished_tools(tool_tasks)
+                if finished:
+                    if pending_text:
+                        yield self._text_chunk(pending_text)
+                        pending_chars = 0
+                    for result in finished:
+                        yield result
+
                 if not chunk.choices or not chunk.choices[0].delta:
                     continue
                 delta = chunk.choices[0].delta
                 if delta.content:
-                    yield {
-                        "content": delta.content,
-                        "metadata": {"type": "text"}
-                    }
+                    if not pending_text:
+                        flush_deadline = loop.time() + STREAM_TEXT_MAX_DELAY_SECONDS
+                    pending_text.append(delta.content)
+                    pending_chars += len(delta.content)
+                    if pending_chars >= STREAM_TEXT_BATCH_CHARS or loop.time() >= flush_deadline:
+                        yield self._text_chunk(pending_text)
+                        pending_chars = 0
                 if delta.tool_calls:
+                    if pending_text:
+                        yield self._text_chunk(pending_text)
+                        pending_chars = 0
                     for tool_call in delta.tool_calls:
-                        await self._accumulate_tool_call(tool_calls, tool_call)
+                        call_id = await self._accumulate_tool_call(tool_calls, tool_call)
                         if tool_call.function and tool_call.function.name:
                             yield {
                                 "content": "",
@@ -713,88 +1316,229 @@ Tool usage:
                                     "tool": tool_call.function.name,
                                 }
                             }
+                        self._start_tool_if_complete(call_id, tool_calls, tool_tasks, context)
+
+            if pending_text:
+                yield self._text_chunk(pending_text)
 
             if not tool_calls and self._should_force_image(message):
                 tool_calls["fallback_generate_image"] = {
                     "name": "generate_image",
-                    "args": json.dumps({"prompt": message})
+                    "args": orjson.dumps({"prompt": message}).decode()
                 }
 
-            async for result in self._emit_tool_results(tool_calls, context):
-                yield result
+            # Calls whose arguments never parsed mid-stream run now
+            remaining_calls = {
+                call_id: call for call_id, call in tool_calls.items()
+                if call_id not in tool_tasks
+            }
+            if remaining_calls:
+                async for result in self._emit_tool_results(remaining_calls, context):
+                    yield result
+
+            while tool_tasks:
+                await asyncio.wait(
+                    [task for _, task in tool_tasks.values()],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for result in self._drain_finished_tools(tool_tasks):
+                    yield result
 
         except APIError as e:
             logger.error(f"Streaming error: {e}")
+            if pending_text:
+                yield self._text_chunk(pending_text)
             yield {
                 "content": "An error occurred while processing your request.",
                 "metadata": {"type": "error", "error": str(e)}
             }
+        finally:
+            if next_chunk is not None:
+                next_chunk.cancel()
+            for _, task in tool_tasks.values():
+                task.cancel()
 
     async def _accumulate_tool_call(
         self,
-        tool_calls: Dict[str, Dict[str, str]],
+        tool_calls: Dict[str, Dict[str, Any]],
         tool_call: Any
-    ) -> None:
-        """Collect tool call arguments from streaming deltas."""
+    ) -> str:
+        """Collect tool call arguments from streaming deltas and return the call id."""
         call_id = tool_call.id
         if not call_id:
             call_index = getattr(tool_call, "index", None)
             call_id = f"call_{call_index}" if call_index is not None else f"call_{len(tool_calls)}"
         if call_id not in tool_calls:
-            tool_calls[call_id] = {"name": "", "args": ""}
+            tool_calls[call_id] = {
+                "name": "",
+                "args": "",
+                "depth": 0,
+                "in_string": False,
+                "escaped": False,
+                "complete": False,
+            }
 
         if tool_call.function and tool_call.function.name:
             tool_calls[call_id]["name"] = tool_call.function.name
         if tool_call.function and tool_call.function.arguments:
             tool_calls[call_id]["args"] += tool_call.function.arguments
+            self._scan_args_fragment(tool_calls[call_id], tool_call.function.arguments)
             logger.debug(f"Accumulated args for {call_id}: {tool_calls[call_id]['args'][:100]}")
+        return call_id
+
+    @staticmethod
+    def _scan_args_fragment(call: Dict[str, Any], fragment: str) -> None:
+        """
+        Track JSON nesting across streamed argument fragments.
+
+        Only the new fragment is scanned, so detecting that the arguments form
+        a closed top-level value is linear in their total length, instead of
+        re-parsing the whole partial string after every delta.
+        """
+        depth = call["depth"]
+        in_string = call["in_string"]
+        escaped = call["escaped"]
+        opened = depth > 0 or call["complete"]
+
+        for char in fragment:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "{[":
+                depth += 1
+                opened = True
+            elif char in "}]":
+                depth -= 1
+
+        call["depth"] = depth
+        call["in_string"] = in_string
+        call["escaped"] = escaped
+        call["complete"] = opened and depth == 0 and not in_string
+
+    def _start_tool_if_complete(
+        self,
+        call_id: str,
+        tool_calls: Dict[str, Dict[str, Any]],
+        tool_tasks: Dict[str, tuple[str, asyncio.Task]],
+        context: AgentContext
+    ) -> None:
+        """Schedule a streamed tool call once its arguments are a complete JSON object."""
+        if call_id in tool_tasks:
+            return
+        call = tool_calls[call_id]
+        if not call["name"] or not call.get("complete"):
+            return
+        try:
+            tool_args = orjson.loads(call["args"])
+        except orjson.JSONDecodeError:
+            return
+        if not isinstance(tool_args, dict):
+            return
+
+        tool_args = self._prepare_tool_args(call["name"], tool_args, context)
+        task = asyncio.create_task(self._run_tool_call(call["name"], tool_args, context))
+        tool_tasks[call_id] = (call["name"], task)
+
+    @staticmethod
+    def _text_chunk(parts: List[str]) -> Dict[str, Any]:
+        """Join buffered text deltas into one stream chunk and reset the buffer."""
+        content = "".join(parts)
+        parts.clear()
+        return {"content": content, "metadata": _TEXT_METADATA}
+
+    def _drain_finished_tools(
+        self,
+        tool_tasks: Dict[str, tuple[str, asyncio.Task]]
+    ) -> List[Dict[str, Any]]:
+        """Pop finished tool tasks and return their result chunks."""
+        finished = [call_id for call_id, (_, task) in tool_tasks.items() if task.done()]
+        chunks = []
+        for call_id in finished:
+            tool_name, task = tool_tasks.pop(call_id)
+            chunks.append(self._tool_result_chunk(tool_name, task.result()))
+        return chunks
+
+    def _prepare_tool_args(
+        self,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        context: AgentContext
+    ) -> Dict[str, Any]:
+        """Apply argument fallbacks before a streamed tool call executes."""
+        # FALLBACK: If generate_image has no prompt, use the user's original message
+        if tool_name == "generate_image" and not tool_args.get("prompt"):
+            if hasattr(context, 'last_message') and context.last_message:
+                logger.info(f"Using context message as prompt fallback: {context.last_message[:50]}")
+                tool_args["prompt"] = context.last_message
+        return tool_args
+
+    async def _run_tool_call(
+        self,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        context: AgentContext
+    ) -> Any:
+        """Execute a streamed tool call, converting failures into an error result."""
+        try:
+            return await self._execute_tool(tool_name, tool_args, context)
+        except Exception as exc:
+            logger.error("Tool execution failed: %s", exc)
+            return {"error": str(exc)}
+
+    @staticmethod
+    def _tool_result_chunk(tool_name: str, result: Any) -> Dict[str, Any]:
+        """Build the stream chunk that reports a tool result."""
+        metadata = {
+            "type": "tool_result",
+            "tool": tool_name,
+            "result": result,
+        }
+        if tool_name == "search_products":
+            metadata["products"] = result
+        if tool_name == "generate_image":
+            metadata["image"] = result
+        if tool_name == "compare_prices":
+            metadata["comparison"] = result
+
+        return {"content": "", "metadata": metadata}
 
     async def _emit_tool_results(
         self,
         tool_calls: Dict[str, Dict[str, str]],
         context: AgentContext
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Execute tool calls and yield results."""
+        """Execute tool calls concurrently and yield results in call order."""
         logger.info(f"Emitting results for {len(tool_calls)} tool calls: {list(tool_calls.keys())}")
+        pending_calls: List[tuple[str, Dict[str, Any]]] = []
         for call in tool_calls.values():
             tool_name = call.get("name")
             raw_args = call.get("args", "")
             logger.info(f"Tool {tool_name} raw args (len={len(raw_args)}): {raw_args[:200] if raw_args else 'EMPTY'}")
             if not tool_name:
                 continue
-            tool_args = self._safe_json_load(raw_args)
+            tool_args = self._prepare_tool_args(tool_name, self._safe_json_load(raw_args), context)
+            pending_calls.append((tool_name, tool_args))
 
-            # FALLBACK: If generate_image has no prompt, use the user's original message
-            if tool_name == "generate_image" and not tool_args.get("prompt"):
-                if hasattr(context, 'last_message') and context.last_message:
-                    logger.info(f"Using context message as prompt fallback: {context.last_message[:50]}")
-                    tool_args["prompt"] = context.last_message
-            try:
-                result = await self._execute_tool(tool_name, tool_args, context)
-            except Exception as exc:
-                logger.error("Tool execution failed: %s", exc)
-                result = {"error": str(exc)}
-
-            metadata = {
-                "type": "tool_result",
-                "tool": tool_name,
-                "result": result,
-            }
-            if tool_name == "search_products":
-                metadata["products"] = result
-            if tool_name == "generate_image":
-                metadata["image"] = result
-            if tool_name == "compare_prices":
-                metadata["comparison"] = result
+        results = await asyncio.gather(*(
+            self._run_tool_call(tool_name, tool_args, context)
+            for tool_name, tool_args in pending_calls
+        ))
 
-            yield {"content": "", "metadata": metadata}
+        for (tool_name, _), result in zip(pending_calls, results):
+            yield self._tool_result_chunk(tool_name, result)
 
     @staticmethod
     def _safe_json_load(raw: str) -> Dict[str, Any]:
         """Safely parse tool arguments from JSON."""
         try:
-            return json.loads(raw) if raw else {}
-        except json.JSONDecodeError:
+            return orjson.loads(raw) if raw else {}
+        except orjson.JSONDecodeError:
             return {}
 
     @staticmethod
@@ -828,42 +1572,57 @@ Tool usage:
         sort_by: str = "relevance",
         limit: int = 20,
     ) -> List[Dict[str, Any]]:
-        """Direct product search (bypasses LLM)."""
-        return await self._handle_search_products(
-            query=query,
-            category=category,
-            max_price=max_price,
-            min_price=min_price,
-            sort_by=sort_by,
-            limit=limit,
+        """Direct product search (bypasses LLM, shares the tool cache)."""
+        tool_input = {
+            "query": query,
+            "category": category,
+            "max_price": max_price,
+            "min_price": min_price,
+            "sort_by": sort_by,
+            "limit": limit,
+        }
+        # Omitted filters key the same as calls from the LLM that leave them out
+        tool_input = {key: value for key, value in tool_input.items() if value is not None}
+        return await self._run_cached(
+            "search_products", tool_input, lambda: self._handle_search_products(**tool_input)
         )
 
     async def compare_prices(self, product_id: str) -> Dict[str, Any]:
         """Direct price comparison (bypasses LLM)."""
         return await self._handle_compare_prices(
             product_name=product_id,  # Will be looked up
-            product_id=product_id
+            product_id=product_id,
         )
 
     async def generate_product_image(
         self,
         prompt: str,
         style: str = "product",
-        aspect_ratio: str = "1:1"
+        aspect_ratio: str = "1:1",
+        user_id: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Direct image generation (bypasses LLM)."""
+        """Direct image generation (bypasses LLM, shares the render cache)."""
         return await self._handle_generate_image(
             prompt=prompt,
             style=style,
-            aspect_ratio=aspect_ratio
+            aspect_ratio=aspect_ratio,
+            user_id=user_id,
         )
 
     async def shutdown(self):
         """Clean shutdown of agent resources."""
         logger.info("Shutting down Commerce Agent...")
 
+        # Let pending chat-history writes finish before closing clients
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
         if self.replicate:
             await self.replicate.shutdown()
 
+        if self._http_client:
+            await self._http_client.aclose()
+            self._http_client = None
+
         self._initialized = False
         logger.info("Commerce Agent shutdown complete")
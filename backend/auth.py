@@ -6,31 +6,38 @@ Implements OWASP API2:2023 Broken Authentication mitigations.
 
 Features:
 - JWT access/refresh token management
-- Bcrypt password hashing
+- Argon2id password hashing (legacy bcrypt hashes still verify)
 - FastAPI OAuth2 integration
 - Token refresh flow
 """
 
+import asyncio
+import base64
+import hashlib
 import logging
 import os
-import secrets
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
 from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+import jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 
-from database import get_user_by_email, get_user_by_id, create_user
+from cache import TTLCache
+from database import get_user_auth_row, get_user_by_id, create_user, normalize_email
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 def _resolve_jwt_secret_key() -> str:
-    secret_key = os.getenv("JWT_SECRET_KEY")
+    # No random fallback: a per-process key would make tokens issued by one
+    # worker fail validation on every other worker.
+    secret_key = os.getenv("JWT_SECRET_KEY", "").strip()
     if not secret_key:
         raise ValueError(
             "JWT_SECRET_KEY environment variable is required. "
@@ -42,7 +49,15 @@ def _resolve_jwt_secret_key() -> str:
 SECRET_KEY = _resolve_jwt_secret_key()
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ACCESS_TOKEN_TTL_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Verified token payloads, so repeat requests with the same bearer token
+# skip the signature check; 0 disables
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+# Argon2id cost, defaulting to OWASP's 19 MiB / t=2 / p=1 profile. The
+# equivalent 46 MiB / t=1 profile trades memory for fewer passes.
+ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", "19456"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
 
 def _get_password_schemes() -> list[str]:
     env_value = os.getenv("PASSWORD_HASH_SCHEMES")
@@ -50,11 +65,27 @@ def _get_password_schemes() -> list[str]:
         return [scheme.strip() for scheme in env_value.split(",") if scheme.strip()]
     if os.getenv("TESTING") == "true":
         return ["pbkdf2_sha256"]
-    return ["bcrypt"]
+    # New hashes use argon2id; existing bcrypt hashes keep verifying
+    return ["argon2", "bcrypt"]
+
+
+def _build_password_context() -> CryptContext:
+    schemes = _get_password_schemes()
+    settings: dict[str, Any] = {}
+    if "argon2" in schemes:
+        settings.update(
+            argon2__type="ID",
+            argon2__memory_cost=ARGON2_MEMORY_COST_KIB,
+            argon2__time_cost=ARGON2_TIME_COST,
+            argon2__parallelism=1,
+            argon2__digest_size=32,
+            argon2__salt_size=16,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
 
 
-# Password hashing context
-pwd_context = CryptContext(schemes=_get_password_schemes(), deprecated="auto")
+# Password hashing context, shared by every JWTAuth instance
+pwd_context = _build_password_context()
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -85,6 +116,16 @@ class TokenResponse(BaseModel):
     expires_in: int
 
 
+def _token_response(access_token: str, refresh_token: str) -> TokenResponse:
+    """Wrap freshly minted tokens; the fields are ours, so skip validation."""
+    return TokenResponse.model_construct(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer",
+        expires_in=ACCESS_TOKEN_TTL_SECONDS,
+    )
+
+
 class UserResponse(BaseModel):
     """User data response."""
     id: int
@@ -125,7 +166,28 @@ class JWTAuth:
 
     def __init__(self, config: JWTConfig):
         self._config = config
-        self._pwd_context = CryptContext(schemes=_get_password_schemes(), deprecated="auto")
+        self._pwd_context = pwd_context
+        # Encode the HMAC key once instead of on every sign/verify
+        self._signing_key = config.secret_key.encode()
+        self._access_token_ttl = timedelta(minutes=config.access_token_expire_minutes)
+        self._refresh_token_ttl = timedelta(days=config.refresh_token_expire_days)
+        # Keyed by a digest so raw tokens are not retained; entries also
+        # carry their exp, which is checked on every hit
+        self._verified_tokens = TTLCache(
+            max_entries=TOKEN_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.access_token_expire_minutes * 60,
+        )
+        # jwt.decode arguments are fixed by the config; build them once
+        self._decode_kwargs = {
+            "algorithms": [config.algorithm],
+            "audience": config.audience or None,
+            "issuer": config.issuer or None,
+            "options": {
+                "require": ["exp", "iat", "type"],
+                "verify_iss": bool(config.issuer),
+                "verify_aud": bool(config.audience),
+            },
+        }
 
         # Validate secret key length
         if len(self._config.secret_key) < self.MIN_SECRET_KEY_LENGTH:
@@ -134,13 +196,13 @@ class JWTAuth:
                 "Consider using a longer key for production."
             )
 
-    def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt."""
-        return self._pwd_context.hash(password)
+    async def hash_password(self, password: str) -> str:
+        """Hash a password in a worker thread so the event loop stays free."""
+        return await asyncio.to_thread(self._pwd_context.hash, password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return self._pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash in a worker thread."""
+        return await asyncio.to_thread(self._pwd_context.verify, plain_password, hashed_password)
 
     def create_access_token(
         self,
@@ -149,17 +211,11 @@ class JWTAuth:
     ) -> str:
         """Create a JWT access token."""
         to_encode = data.copy()
-
-        if expires_delta:
-            expire = datetime.now(timezone.utc) + expires_delta
-        else:
-            expire = datetime.now(timezone.utc) + timedelta(
-                minutes=self._config.access_token_expire_minutes
-            )
+        now = datetime.now(timezone.utc)
 
         to_encode.update({
-            "exp": expire,
-            "iat": datetime.now(timezone.utc),
+            "exp": now + (expires_delta or self._access_token_ttl),
+            "iat": now,
             "type": "access"
         })
 
@@ -170,7 +226,7 @@ class JWTAuth:
 
         return jwt.encode(
             to_encode,
-            self._config.secret_key,
+            self._signing_key,
             algorithm=self._config.algorithm
         )
 
@@ -181,19 +237,13 @@ class JWTAuth:
     ) -> str:
         """Create a JWT refresh token."""
         to_encode = data.copy()
-
-        if expires_delta:
-            expire = datetime.now(timezone.utc) + expires_delta
-        else:
-            expire = datetime.now(timezone.utc) + timedelta(
-                days=self._config.refresh_token_expire_days
-            )
+        now = datetime.now(timezone.utc)
 
         to_encode.update({
-            "exp": expire,
-            "iat": datetime.now(timezone.utc),
+            "exp": now + (expires_delta or self._refresh_token_ttl),
+            "iat": now,
             "type": "refresh",
-            "jti": secrets.token_urlsafe(32)
+            "jti": generate_secure_token(32)
         })
 
         if self._config.issuer:
@@ -203,7 +253,7 @@ class JWTAuth:
 
         return jwt.encode(
             to_encode,
-            self._config.secret_key,
+            self._signing_key,
             algorithm=self._config.algorithm
         )
 
@@ -213,26 +263,24 @@ class JWTAuth:
         token_type: str = "access"
     ) -> Optional[dict[str, Any]]:
         """Verify and decode a JWT token."""
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        payload = self._verified_tokens.get(key)
+        if payload is not None:
+            if payload["exp"] > time.time():
+                return dict(payload) if payload["type"] == token_type else None
+            self._verified_tokens.pop(key)
+
         try:
-            payload = jwt.decode(
-                token,
-                self._config.secret_key,
-                algorithms=[self._config.algorithm],
-                audience=self._config.audience if self._config.audience else None,
-                issuer=self._config.issuer if self._config.issuer else None,
-                options={
-                    "verify_iss": bool(self._config.issuer),
-                    "verify_aud": bool(self._config.audience)
-                }
-            )
+            payload = jwt.decode(token, self._signing_key, **self._decode_kwargs)
 
             # Verify token type
             if payload.get("type") != token_type:
                 return None
 
-            return payload
+            self._verified_tokens.set(key, payload)
+            return dict(payload)
 
-        except JWTError as e:
+        except jwt.PyJWTError as e:
             logger.debug(f"Token verification failed: {e}")
             return None
 
@@ -280,56 +328,64 @@ def get_jwt_auth() -> JWTAuth:
 # Authentication Functions
 # =============================================================================
 
-async def register_user(user_data: UserCreate, db) -> TokenResponse:
+async def register_user(user_data: UserCreate, db=None) -> TokenResponse:
     """Register a new user."""
     jwt_auth = get_jwt_auth()
 
-    # Check if user exists
-    existing_user = await get_user_by_email(user_data.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-
-    # Hash password and create user
-    hashed_password = jwt_auth.hash_password(user_data.password)
+    # Hash password and create user; the insert itself detects duplicates
+    email = normalize_email(user_data.email)
+    hashed_password = await jwt_auth.hash_password(user_data.password)
     user_id = await create_user(
-        email=user_data.email,
+        email=email,
         hashed_password=hashed_password,
         wallet_address=user_data.wallet_address
     )
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
 
     # Create tokens
-    token_data = {"sub": str(user_id), "email": user_data.email}
+    token_data = {"sub": str(user_id), "email": email, "uv": 0}
     access_token = jwt_auth.create_access_token(token_data)
     refresh_token = jwt_auth.create_refresh_token(token_data)
 
-    logger.info(f"User registered: {user_data.email}")
+    logger.info(f"User registered: {email}")
 
-    return TokenResponse(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        token_type="bearer",
-        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    )
+    return _token_response(access_token, refresh_token)
 
 
-async def authenticate_user(user_login: UserLogin, db) -> TokenResponse:
+async def authenticate_user(user_login: UserLogin, db=None) -> TokenResponse:
     """Authenticate a user and return tokens."""
     jwt_auth = get_jwt_auth()
 
-    # Get user by email
-    user = await get_user_by_email(user_login.email)
+    # Get only the columns login needs
+    user = await get_user_auth_row(user_login.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
             headers={"WWW-Authenticate": "Bearer"}
         )
+    user_id, email, hashed_password, is_active, version = user
 
-    # Verify password
-    if not jwt_auth.verify_password(user_login.password, user["hashed_password"]):
+    # Verify the password in a worker thread and mint tokens meanwhile;
+    # the tokens are discarded unless verification and the checks pass.
+    verification = asyncio.create_task(
+        jwt_auth.verify_password(user_login.password, hashed_password)
+    )
+    await asyncio.sleep(0)  # let the verify start before signing
+
+    # "uv" lets a refresh detect tokens revoked since issue
+    token_data = {"sub": str(user_id), "email": email, "uv": version}
+    try:
+        access_token = jwt_auth.create_access_token(token_data)
+        refresh_token = jwt_auth.create_refresh_token(token_data)
+    finally:
+        password_ok = await verification
+
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -337,29 +393,19 @@ async def authenticate_user(user_login: UserLogin, db) -> TokenResponse:
         )
 
     # Check if user is active
-    if not user.get("is_active", True):
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Account is disabled",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-    # Create tokens
-    token_data = {"sub": str(user["id"]), "email": user["email"]}
-    access_token = jwt_auth.create_access_token(token_data)
-    refresh_token = jwt_auth.create_refresh_token(token_data)
-
     logger.info(f"User authenticated: {user_login.email}")
 
-    return TokenResponse(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        token_type="bearer",
-        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    )
+    return _token_response(access_token, refresh_token)
 
 
-async def refresh_access_token(refresh_token: str, db) -> TokenResponse:
+async def refresh_access_token(refresh_token: str, db=None) -> TokenResponse:
     """Refresh an access token using a refresh token."""
     jwt_auth = get_jwt_auth()
 
@@ -389,45 +435,50 @@ async def refresh_access_token(refresh_token: str, db) -> TokenResponse:
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    # Tokens issued before a password change or deactivation are revoked
+    if payload.get("uv", 0) != user.get("version", 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
     # Create new tokens
-    token_data = {"sub": str(user["id"]), "email": user["email"]}
+    token_data = {"sub": str(user["id"]), "email": user["email"], "uv": user.get("version", 0)}
     new_access_token = jwt_auth.create_access_token(token_data)
     new_refresh_token = jwt_auth.create_refresh_token(token_data)
 
     logger.info(f"Token refreshed for user: {user['email']}")
 
-    return TokenResponse(
-        access_token=new_access_token,
-        refresh_token=new_refresh_token,
-        token_type="bearer",
-        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    )
+    return _token_response(new_access_token, new_refresh_token)
+
+
+def _decode_current_user(token: Optional[str]) -> Optional[dict]:
+    """Return the payload of a valid access token with a subject, else None."""
+    if not token:
+        return None
+    payload = get_jwt_auth().verify_token(token, token_type="access")
+    if not payload or not payload.get("sub"):
+        return None
+    return payload
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """
     Get the current authenticated user from the JWT token.
 
-    FastAPI dependency for protected endpoints.
+    FastAPI dependency for protected endpoints. Kept async on purpose: HS256
+    verification (usually a verify-cache hit) costs microseconds, less than
+    the threadpool hop a sync dependency would add.
     """
-    jwt_auth = get_jwt_auth()
-
-    payload = jwt_auth.verify_token(token, token_type="access")
-    if not payload:
+    payload = _decode_current_user(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-
     # Return the payload (contains sub, email, etc.)
     return payload
 
@@ -442,31 +493,57 @@ async def get_current_user_optional(
     if not authorization:
         return None
 
-    # Parse Bearer token
-    if not authorization.startswith("Bearer "):
-        return None
-
-    token = authorization.split(" ", 1)[1]
-
-    jwt_auth = get_jwt_auth()
-    try:
-        payload = jwt_auth.verify_token(token)
-        if payload is None or "sub" not in payload:
-            return None
-        return payload
-    except Exception:
+    # Parse Bearer token; anything else is treated as anonymous
+    scheme, _, token = authorization.partition(" ")
+    if scheme != "Bearer":
         return None
+    return _decode_current_user(token)
 
 
 # =============================================================================
 # Utility Functions
 # =============================================================================
 
+class _RandomPool:
+    """
+    Hands out slices of one large os.urandom() read.
+
+    Amortizes the getrandom() syscall over many small tokens. Bytes are
+    never handed out twice, and forked children drop the inherited buffer
+    so worker processes never share random state.
+    """
+
+    def __init__(self, size: int = 4096):
+        self._size = size
+        self.reset()
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._offset = 0
+
+    def take(self, n: int) -> bytes:
+        if n > self._size:
+            return os.urandom(n)
+        with self._lock:
+            if self._offset + n > len(self._buffer):
+                self._buffer = os.urandom(self._size)
+                self._offset = 0
+            start = self._offset
+            self._offset += n
+            return self._buffer[start:self._offset]
+
+
+_random_pool = _RandomPool()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_random_pool.reset)
+
+
 def generate_secure_token(length: int = 32) -> str:
-    """Generate a cryptographically secure random token."""
-    return secrets.token_urlsafe(length)
+    """Generate a cryptographically secure random token from length random bytes."""
+    return base64.urlsafe_b64encode(_random_pool.take(length)).rstrip(b"=").decode()
 
 
 def generate_api_key(prefix: str = "sk") -> str:
     """Generate an API key with prefix."""
-    return f"{prefix}_{secrets.token_urlsafe(32)}"
+    return f"{prefix}_{generate_secure_token(32)}"
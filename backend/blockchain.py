@@ -6,15 +6,21 @@ Provides helpers for verifying escrow transactions on-chain.
 COM-005: Added graceful error handling for RPC failures.
 """
 
-import json
+import asyncio
 import logging
 import os
 import re
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 from web3.exceptions import TransactionNotFound, ContractLogicError
 
+from cache import TTLCache
+
 # web3.py v7+ compatibility
 try:
     from web3.middleware import ExtraDataToPOAMiddleware
@@ -26,6 +32,18 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 ARC_RPC_URL = os.getenv("ALCHEMY_ARC_RPC") or os.getenv("ARC_RPC_URL") or "http://127.0.0.1:8545"
+ARC_RPC_TIMEOUT_SECONDS = float(os.getenv("ARC_RPC_TIMEOUT_SECONDS", "10"))
+# Receipts fetched per JSON-RPC batch request
+ARC_RPC_BATCH_SIZE = max(1, int(os.getenv("ARC_RPC_BATCH_SIZE", "50")))
+# Threads for blocking RPC calls, kept apart from the default executor so a
+# slow node cannot starve password hashing and other to_thread work
+ARC_RPC_MAX_WORKERS = int(os.getenv("ARC_RPC_MAX_WORKERS", "16"))
+_rpc_executor = ThreadPoolExecutor(max_workers=ARC_RPC_MAX_WORKERS, thread_name_prefix="arc-rpc")
+# Confirmed receipts and their decoded escrow events, keyed by tx hash
+RECEIPT_CACHE_TTL_SECONDS = int(os.getenv("RECEIPT_CACHE_TTL_SECONDS", "3600"))
+RECEIPT_CACHE_MAX_ENTRIES = int(os.getenv("RECEIPT_CACHE_MAX_ENTRIES", "50000"))
+_receipt_cache = TTLCache(max_entries=RECEIPT_CACHE_MAX_ENTRIES, ttl_seconds=RECEIPT_CACHE_TTL_SECONDS)
+_event_cache = TTLCache(max_entries=RECEIPT_CACHE_MAX_ENTRIES, ttl_seconds=RECEIPT_CACHE_TTL_SECONDS)
 _TX_HASH_RE = re.compile(r"^0x[0-9a-fA-F]{64}$")
 
 
@@ -54,13 +72,49 @@ ESCROW_ABI = [
 ]
 
 
+# topic0 of EscrowCreated, so unrelated logs are skipped before ABI decoding
+_ESCROW_CREATED_TOPIC = Web3.keccak(text="EscrowCreated(uint256,address,address,uint256)")
+
+
+@lru_cache(maxsize=1)
 def get_web3() -> Web3:
-    """Return a configured Web3 instance."""
-    w3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+    """
+    Return the process-wide Web3 instance.
+
+    Built once so every verification reuses the same keep-alive connection
+    pool and middleware stack instead of reconnecting per call.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    w3 = Web3(Web3.HTTPProvider(
+        ARC_RPC_URL,
+        request_kwargs={"timeout": ARC_RPC_TIMEOUT_SECONDS},
+        session=session,
+    ))
     w3.middleware_onion.inject(poa_middleware, layer=0)
     return w3
 
 
+async def run_rpc(func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking web3 helper on the RPC thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_rpc_executor, partial(func, *args, **kwargs))
+
+
+@lru_cache(maxsize=4096)
+def _checksum(address: str) -> str:
+    """EIP-55 checksum an address; memoized because each call is a keccak hash."""
+    return Web3.to_checksum_address(address)
+
+
+@lru_cache(maxsize=256)
+def _escrow_contract(escrow_address: str) -> Any:
+    """Contract wrapper for an escrow address, built once with its ABI codec."""
+    return get_web3().eth.contract(address=escrow_address, abi=ESCROW_ABI)
+
+
 def verify_escrow_transaction(
     tx_hash: str,
     escrow_address: str,
@@ -74,27 +128,121 @@ def verify_escrow_transaction(
     COM-005: Handles RPC failures gracefully instead of raising exceptions.
     Returns pending/failed status with reason on error.
     """
-    try:
-        tx_hash = normalize_tx_hash(tx_hash)
-    except InvalidTransactionHash:
-        return {"status": "failed", "verified": False, "reason": "invalid_tx_hash"}
+    return verify_escrow_transactions_batch([{
+        "tx_hash": tx_hash,
+        "escrow_address": escrow_address,
+        "expected_buyer": expected_buyer,
+        "expected_seller": expected_seller,
+        "expected_amount": expected_amount,
+    }])[0]
+
+
+def verify_escrow_transactions_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Verify several escrow transactions, sharing JSON-RPC round-trips.
+
+    Each item takes the keyword arguments of verify_escrow_transaction.
+    Receipts are fetched in JSON-RPC batches of ARC_RPC_BATCH_SIZE; results
+    are returned in item order.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending: List[Tuple[int, str]] = []
+    for index, item in enumerate(items):
+        try:
+            pending.append((index, normalize_tx_hash(item["tx_hash"])))
+        except InvalidTransactionHash:
+            results[index] = {"status": "failed", "verified": False, "reason": "invalid_tx_hash"}
 
+    if pending:
+        try:
+            w3 = get_web3()
+        except Exception as e:
+            logger.warning(f"Error creating RPC client: {e}")
+            for index, _ in pending:
+                results[index] = {
+                    "status": "pending",
+                    "verified": False,
+                    "reason": f"rpc_error: {type(e).__name__}",
+                }
+            return results
+
+        # Confirmed receipts are final, so only uncached hashes hit the RPC
+        fetched: Dict[str, Tuple[Any, Optional[Dict[str, Any]]]] = {}
+        for _, tx_hash in pending:
+            cached = _receipt_cache.get(tx_hash)
+            if cached is not None:
+                fetched[tx_hash] = (cached, None)
+        misses = list(dict.fromkeys(tx_hash for _, tx_hash in pending if tx_hash not in fetched))
+
+        for start in range(0, len(misses), ARC_RPC_BATCH_SIZE):
+            chunk = misses[start:start + ARC_RPC_BATCH_SIZE]
+            for tx_hash, (receipt, error) in zip(chunk, _fetch_receipts(w3, chunk)):
+                fetched[tx_hash] = (receipt, error)
+                # Pending or reverted receipts are not cached so later
+                # inclusion is still observed
+                if receipt is not None and receipt.status == 1:
+                    _receipt_cache.set(tx_hash, receipt)
+
+        for index, tx_hash in pending:
+            receipt, error = fetched[tx_hash]
+            if error is not None:
+                results[index] = error
+                continue
+            item = items[index]
+            results[index] = _verify_receipt(
+                tx_hash,
+                receipt,
+                item["escrow_address"],
+                item.get("expected_buyer"),
+                item.get("expected_seller"),
+                item.get("expected_amount"),
+            )
+
+    return results
+
+
+def _fetch_receipts(w3: Web3, tx_hashes: List[str]) -> List[Tuple[Any, Optional[Dict[str, Any]]]]:
+    """Fetch receipts in one JSON-RPC batch, falling back to one call per hash."""
+    if len(tx_hashes) > 1 and hasattr(w3, "batch_requests"):
+        try:
+            with w3.batch_requests() as batch:
+                for tx_hash in tx_hashes:
+                    batch.add(w3.eth.get_transaction_receipt(tx_hash))
+                receipts = batch.execute()
+            return [(receipt, None) for receipt in receipts]
+        except Exception as e:
+            # A missing receipt fails the whole batch; fetch individually
+            logger.debug(f"Batched receipt fetch failed, retrying individually: {e}")
+    return [_fetch_receipt(w3, tx_hash) for tx_hash in tx_hashes]
+
+
+def _fetch_receipt(w3: Web3, tx_hash: str) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Fetch one receipt, mapping RPC failures to a pending result."""
     try:
-        w3 = get_web3()
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
+        return w3.eth.get_transaction_receipt(tx_hash), None
     except TransactionNotFound:
         # COM-005: Transaction not yet mined or invalid hash
         logger.debug(f"Transaction not found: {tx_hash}")
-        return {"status": "pending", "verified": False, "reason": "tx_not_found"}
+        return None, {"status": "pending", "verified": False, "reason": "tx_not_found"}
     except ConnectionError as e:
         # COM-005: RPC connection failed
         logger.warning(f"RPC connection error for {tx_hash}: {e}")
-        return {"status": "pending", "verified": False, "reason": "rpc_connection_error"}
+        return None, {"status": "pending", "verified": False, "reason": "rpc_connection_error"}
     except Exception as e:
         # COM-005: Catch other web3 exceptions (invalid hash format, etc.)
         logger.warning(f"Error fetching transaction {tx_hash}: {e}")
-        return {"status": "pending", "verified": False, "reason": f"rpc_error: {type(e).__name__}"}
+        return None, {"status": "pending", "verified": False, "reason": f"rpc_error: {type(e).__name__}"}
+
 
+def _verify_receipt(
+    tx_hash: str,
+    receipt: Any,
+    escrow_address: str,
+    expected_buyer: Optional[str],
+    expected_seller: Optional[str],
+    expected_amount: Optional[int],
+) -> Dict[str, Any]:
+    """Check a fetched receipt against the escrow contract and expectations."""
     if receipt is None:
         return {"status": "pending", "verified": False}
 
@@ -102,24 +250,24 @@ def verify_escrow_transaction(
         return {"status": "failed", "verified": False}
 
     try:
-        escrow_address = Web3.to_checksum_address(escrow_address)
-        if receipt.to and Web3.to_checksum_address(receipt.to) != escrow_address:
+        escrow_address = _checksum(escrow_address)
+        if receipt.to and _checksum(receipt.to) != escrow_address:
             return {"status": "failed", "verified": False, "reason": "tx_to_mismatch"}
 
-        contract = w3.eth.contract(address=escrow_address, abi=ESCROW_ABI)
-        events = contract.events.EscrowCreated().process_receipt(receipt)
+        events = _escrow_events(tx_hash, escrow_address, receipt)
         if not events:
             return {"status": "failed", "verified": False, "reason": "missing_event"}
 
-        event = events[0]
-        buyer = Web3.to_checksum_address(event["args"]["buyer"])
-        seller = Web3.to_checksum_address(event["args"]["seller"])
-        amount = int(event["args"]["amount"])
+        args = events[0]["args"]
+        escrow_id = int(args["escrowId"])
+        buyer = _checksum(args["buyer"])
+        seller = _checksum(args["seller"])
+        amount = int(args["amount"])
 
-        if expected_buyer and Web3.to_checksum_address(expected_buyer) != buyer:
+        if expected_buyer and _checksum(expected_buyer) != buyer:
             return {"status": "failed", "verified": False, "reason": "buyer_mismatch"}
 
-        if expected_seller and Web3.to_checksum_address(expected_seller) != seller:
+        if expected_seller and _checksum(expected_seller) != seller:
             return {"status": "failed", "verified": False, "reason": "seller_mismatch"}
 
         if expected_amount is not None and expected_amount != amount:
@@ -128,11 +276,12 @@ def verify_escrow_transaction(
         return {
             "status": "confirmed",
             "verified": True,
-            "escrow_id": str(event["args"]["escrowId"]),
+            "escrow_id": str(escrow_id),
             "buyer": buyer,
             "seller": seller,
             "amount": amount,
-            "raw_event": json.loads(Web3.to_json(event["args"])),
+            # Decoded args are already ints and checksum strings; no JSON round-trip needed
+            "raw_event": {"escrowId": escrow_id, "buyer": buyer, "seller": seller, "amount": amount},
         }
     except ContractLogicError as e:
         # COM-005: Contract execution error
@@ -142,3 +291,28 @@ def verify_escrow_transaction(
         # COM-005: Catch unexpected errors during event processing
         logger.error(f"Unexpected error verifying {tx_hash}: {e}")
         return {"status": "failed", "verified": False, "reason": f"verification_error: {type(e).__name__}"}
+
+
+def _escrow_events(tx_hash: str, escrow_address: str, receipt: Any) -> Any:
+    """
+    Decode EscrowCreated events from a confirmed receipt, once per escrow.
+
+    Only logs emitted by the escrow contract with the EscrowCreated topic
+    reach the ABI decoder.
+    """
+    key = (tx_hash, escrow_address)
+    events = _event_cache.get(key)
+    if events is None:
+        candidates = [
+            log for log in receipt.logs
+            if log["topics"]
+            and log["topics"][0] == _ESCROW_CREATED_TOPIC
+            and _checksum(log["address"]) == escrow_address
+        ]
+        if candidates:
+            event_abi = _escrow_contract(escrow_address).events.EscrowCreated()
+            events = tuple(event_abi.process_log(log) for log in candidates)
+        else:
+            events = ()
+        _event_cache.set(key, events)
+    return events
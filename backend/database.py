@@ -7,7 +7,7 @@ concurrent reads and improved write performance.
 
 Features:
 - WAL mode for concurrent access
-- Connection pooling via context manager
+- Pooled read-only connections; per-session connections for writes
 - Async session factory
 - Schema initialization
 """
@@ -17,22 +17,62 @@ import logging
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, List, Optional, Tuple
 
 import aiosqlite
 
+from cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 # Database configuration
 DATABASE_PATH = os.getenv("DATABASE_PATH", "./data/app.db")
 WAL_MODE = True
 BUSY_TIMEOUT = 5000  # 5 seconds
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+PAGE_SIZE = int(os.getenv("SQLITE_PAGE_SIZE", "8192"))
+WAL_AUTOCHECKPOINT = int(os.getenv("SQLITE_WAL_AUTOCHECKPOINT", "1000"))
+JOURNAL_SIZE_LIMIT = int(os.getenv("SQLITE_JOURNAL_SIZE_LIMIT", str(64 * 1024 * 1024)))
+READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", str(min(32, (os.cpu_count() or 1) * 4))))
+
+# Most PRAGMAs are per-connection, so every connection applies them (in one
+# round-trip); journal_mode and page_size persist in the file and are set in init_db.
+_CONNECTION_PRAGMAS = f"""
+    PRAGMA foreign_keys=ON;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=10000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size={MMAP_SIZE};
+    PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT};
+    PRAGMA journal_size_limit={JOURNAL_SIZE_LIMIT};
+"""
+
+# User rows are read on every login/refresh; keep recent lookups in memory.
+# Any write to a user row must call invalidate_user().
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+_users_by_email = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+_users_by_id = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+# Transaction rows looked up by wallet retries of /transactions/verify.
+# Any write to a transaction row must call invalidate_transaction().
+TRANSACTION_CACHE_TTL_SECONDS = int(os.getenv("TRANSACTION_CACHE_TTL_SECONDS", "60"))
+TRANSACTION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSACTION_CACHE_MAX_ENTRIES", "10000"))
+_transactions_by_hash = TTLCache(
+    max_entries=TRANSACTION_CACHE_MAX_ENTRIES, ttl_seconds=TRANSACTION_CACHE_TTL_SECONDS
+)
+_transactions_by_key = TTLCache(
+    max_entries=TRANSACTION_CACHE_MAX_ENTRIES, ttl_seconds=TRANSACTION_CACHE_TTL_SECONDS
+)
 
 # COM-002: Use per-request connections instead of global shared connection
 # to ensure proper transaction isolation between concurrent requests
 _db_initialized = False
 _init_lock = asyncio.Lock()
 
+# Idle read-only connections reused by get_reader()
+_idle_readers: List[aiosqlite.Connection] = []
+
 
 async def init_db():
     """
@@ -46,27 +86,31 @@ async def init_db():
     # Ensure data directory exists
     db_path = Path(DATABASE_PATH)
     db_path.parent.mkdir(parents=True, exist_ok=True)
+    is_new_database = not db_path.exists()
 
     logger.info(f"Initializing database at {DATABASE_PATH}")
 
     async with _init_lock:
         if not _db_initialized:
+            # Pooled readers may point at a previous database file
+            await _close_readers()
+
             # Create a temporary connection just for initialization
             conn = await aiosqlite.connect(
                 DATABASE_PATH,
                 timeout=BUSY_TIMEOUT / 1000,
             )
             try:
+                # page_size only applies before the first table is created
+                if is_new_database:
+                    await conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+
                 # Enable WAL mode for better concurrency
                 if WAL_MODE:
                     await conn.execute("PRAGMA journal_mode=WAL")
-                    await conn.execute("PRAGMA synchronous=NORMAL")
-                    await conn.execute("PRAGMA cache_size=10000")
-                    await conn.execute("PRAGMA temp_store=MEMORY")
                     logger.info("WAL mode enabled")
 
-                # Enable foreign keys
-                await conn.execute("PRAGMA foreign_keys=ON")
+                await conn.executescript(_CONNECTION_PRAGMAS)
 
                 # Create tables
                 await _create_tables(conn)
@@ -90,7 +134,8 @@ async def _create_tables(conn: aiosqlite.Connection):
             wallet_address TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT TRUE
+            is_active BOOLEAN DEFAULT TRUE,
+            version INTEGER NOT NULL DEFAULT 0
         )
     """)
 
@@ -99,6 +144,12 @@ async def _create_tables(conn: aiosqlite.Connection):
         CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)
     """)
 
+    # Lookups match on lower(email) so rows stored before emails were
+    # normalized are still found
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email))
+    """)
+
     # Products table
     await conn.execute("""
         CREATE TABLE IF NOT EXISTS products (
@@ -198,11 +249,7 @@ async def _create_tables(conn: aiosqlite.Connection):
         )
     """)
 
-    # Ensure idempotency_key column exists for older databases
-    try:
-        await conn.execute("ALTER TABLE transactions ADD COLUMN idempotency_key TEXT")
-    except aiosqlite.OperationalError:
-        pass
+    await _apply_migrations(conn)
 
     # Create unique index for idempotency keys
     await conn.execute("""
@@ -214,18 +261,107 @@ async def _create_tables(conn: aiosqlite.Connection):
     logger.info("Database tables created")
 
 
+# Column additions for databases created before the column was part of its
+# CREATE TABLE. PRAGMA user_version counts the steps already applied, so
+# only append to this tuple.
+_MIGRATIONS = (
+    "ALTER TABLE transactions ADD COLUMN idempotency_key TEXT",
+    "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+)
+
+
+async def _apply_migrations(conn: aiosqlite.Connection):
+    """Run the migrations newer than the database's user_version."""
+    async with conn.execute("PRAGMA user_version") as cursor:
+        (applied,) = await cursor.fetchone()
+    if applied >= len(_MIGRATIONS):
+        return
+
+    for statement in _MIGRATIONS[applied:]:
+        try:
+            await conn.execute(statement)
+        except aiosqlite.OperationalError as e:
+            # New databases, and ones from before user_version was tracked,
+            # may already have the column
+            if "duplicate column" not in str(e):
+                raise
+    await conn.execute(f"PRAGMA user_version={len(_MIGRATIONS)}")
+    logger.info(f"Database schema migrated to version {len(_MIGRATIONS)}")
+
+
 async def close_db():
     """
     Close/cleanup database resources.
 
-    COM-002: With per-request connections, this is now a no-op for cleanup.
-    Individual connections are closed after each request.
+    COM-002: Writer connections are closed after each request; this closes
+    the idle pooled readers and clears the lookup caches.
     """
     global _db_initialized
     _db_initialized = False
+    await _close_readers()
+    _users_by_email.clear()
+    _users_by_id.clear()
+    _transactions_by_hash.clear()
+    _transactions_by_key.clear()
     logger.info("Database cleanup complete")
 
 
+async def _connect(read_only: bool = False) -> aiosqlite.Connection:
+    """Open a connection with the per-connection PRAGMAs applied."""
+    pending = aiosqlite.connect(
+        DATABASE_PATH,
+        timeout=BUSY_TIMEOUT / 1000,  # busy timeout for lock waits
+        # Readers never write, so run them in plain autocommit mode
+        isolation_level=None if read_only else "",
+    )
+    if read_only:
+        # Pooled readers outlive requests; daemon threads keep an idle pool
+        # from blocking interpreter exit when close_db() is never awaited
+        pending.daemon = True
+    conn = await pending
+    pragmas = _CONNECTION_PRAGMAS
+    if read_only:
+        pragmas += "PRAGMA query_only=1;\n"
+    await conn.executescript(pragmas)
+    return conn
+
+
+async def _close_readers() -> None:
+    """Close every idle pooled reader connection."""
+    while _idle_readers:
+        await _idle_readers.pop().close()
+
+
+@asynccontextmanager
+async def get_reader() -> AsyncGenerator[aiosqlite.Connection, None]:
+    """
+    Borrow a read-only connection from the reader pool.
+
+    WAL lets readers run alongside the writer, so read helpers reuse
+    query_only connections instead of opening one per call. Writes keep
+    their own per-session connections (COM-002). Up to READER_POOL_SIZE
+    idle readers are kept; bursts beyond that get a temporary connection
+    that is closed on release.
+    """
+    if _idle_readers:
+        # Pooled readers only exist after init_db, so skip the init check
+        conn = _idle_readers.pop()
+    else:
+        if not _db_initialized:
+            await init_db()
+        conn = await _connect(read_only=True)
+    try:
+        yield conn
+    except BaseException:
+        await conn.close()
+        raise
+
+    if len(_idle_readers) < READER_POOL_SIZE:
+        _idle_readers.append(conn)
+    else:
+        await conn.close()
+
+
 async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     """
     FastAPI dependency that yields a database connection.
@@ -236,11 +372,7 @@ async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     if not _db_initialized:
         await init_db()
 
-    conn = await aiosqlite.connect(
-        DATABASE_PATH,
-        timeout=BUSY_TIMEOUT / 1000,
-    )
-    await conn.execute("PRAGMA foreign_keys=ON")
+    conn = await _connect()
     try:
         yield conn
         await conn.commit()
@@ -262,11 +394,7 @@ async def get_db_context() -> AsyncGenerator[aiosqlite.Connection, None]:
     if not _db_initialized:
         await init_db()
 
-    conn = await aiosqlite.connect(
-        DATABASE_PATH,
-        timeout=BUSY_TIMEOUT / 1000,
-    )
-    await conn.execute("PRAGMA foreign_keys=ON")
+    conn = await _connect()
     try:
         yield conn
         await conn.commit()
@@ -300,11 +428,7 @@ class DatabaseSession:
             await init_db()
 
         # COM-002: Create dedicated connection for this session
-        self.connection = await aiosqlite.connect(
-            DATABASE_PATH,
-            timeout=BUSY_TIMEOUT / 1000,
-        )
-        await self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection = await _connect()
         self._owns_connection = True
         return self
 
@@ -351,42 +475,131 @@ class DatabaseSession:
 
 # Convenience functions for common operations
 
+def normalize_email(email: str) -> str:
+    """Canonical form used to store, look up and cache user emails."""
+    return email.strip().lower()
+
+
+def _cache_user(user: dict) -> None:
+    _users_by_email.set(normalize_email(user["email"]), user)
+    _users_by_id.set(user["id"], user)
+
+
+def invalidate_user(email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+    """Drop cached user rows after the user is created or modified."""
+    if email is not None:
+        _users_by_email.pop(normalize_email(email))
+    if user_id is not None:
+        _users_by_id.pop(user_id)
+
+
 async def get_user_by_email(email: str) -> Optional[dict]:
     """Get a user by email address."""
-    async with get_db_context() as db:
+    email = normalize_email(email)
+    cached = _users_by_email.get(email)
+    if cached is not None:
+        return dict(cached)
+
+    async with get_reader() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM users WHERE email = ?",
+        async with db.execute(
+            "SELECT * FROM users WHERE lower(email) = ?",
             (email,)
-        )
-        row = await cursor.fetchone()
+        ) as cursor:
+            row = await cursor.fetchone()
         if row:
-            return dict(row)
+            user = dict(row)
+            _cache_user(user)
+            return dict(user)
         return None
 
 
+async def get_user_auth_row(email: str) -> Optional[tuple]:
+    """
+    Get only the columns login needs: (id, email, hashed_password, is_active, version).
+
+    Returns a plain tuple; use get_user_by_email for the full user record.
+    A miss loads the full row through get_user_by_email so the user cache
+    is warm for the requests that follow a login.
+    """
+    email = normalize_email(email)
+    user = _users_by_email.get(email)
+    if user is None:
+        user = await get_user_by_email(email)
+        if user is None:
+            return None
+
+    return (
+        user["id"],
+        user["email"],
+        user["hashed_password"],
+        user["is_active"],
+        user["version"],
+    )
+
+
 async def get_user_by_id(user_id: int) -> Optional[dict]:
     """Get a user by ID."""
-    async with get_db_context() as db:
+    cached = _users_by_id.get(user_id)
+    if cached is not None:
+        return dict(cached)
+
+    async with get_reader() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
+        async with db.execute(
             "SELECT * FROM users WHERE id = ?",
             (user_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row:
+            user = dict(row)
+            _cache_user(user)
+            return dict(user)
+        return None
+
+
+async def create_user(email: str, hashed_password: str, wallet_address: Optional[str] = None) -> Optional[int]:
+    """
+    Create a new user and return the user ID.
+
+    Returns None if the email is already registered, so callers need no
+    separate existence check.
+    """
+    email = normalize_email(email)
+    async with DatabaseSession() as session:
+        # NOT EXISTS also catches rows stored with their original casing
+        cursor = await session.execute(
+            """
+            INSERT INTO users (email, hashed_password, wallet_address)
+            SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM users WHERE lower(email) = ?)
+            ON CONFLICT(email) DO NOTHING
+            RETURNING id
+            """,
+            (email, hashed_password, wallet_address, email)
         )
         row = await cursor.fetchone()
-        if row:
-            return dict(row)
+    if row is None:
         return None
+    user_id = row[0]
+    invalidate_user(email=email, user_id=user_id)
+    return user_id
 
 
-async def create_user(email: str, hashed_password: str, wallet_address: Optional[str] = None) -> int:
-    """Create a new user and return the user ID."""
+async def bump_user_version(user_id: int) -> None:
+    """
+    Invalidate a user's outstanding tokens.
+
+    Call after a password change or deactivation: refresh tokens carrying the
+    old version are rejected on their next use.
+    """
     async with DatabaseSession() as session:
-        await session.execute(
-            "INSERT INTO users (email, hashed_password, wallet_address) VALUES (?, ?, ?)",
-            (email, hashed_password, wallet_address)
+        cursor = await session.execute(
+            "UPDATE users SET version = version + 1, updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? RETURNING email",
+            (user_id,)
         )
-        return session.lastrowid
+        row = await cursor.fetchone()
+    invalidate_user(email=row[0] if row else None, user_id=user_id)
 
 
 async def save_chat_message(session_id: int, role: str, content: str, metadata: Optional[str] = None):
@@ -399,21 +612,52 @@ async def save_chat_message(session_id: int, role: str, content: str, metadata:
         return session.lastrowid
 
 
+async def save_chat_messages_bulk(rows: List[Tuple[int, str, str, Optional[str]]]) -> None:
+    """
+    Save many chat messages in one transaction.
+
+    rows are (session_id, role, content, metadata) tuples; accumulate a
+    turn's messages and flush them together to pay for a single commit.
+    """
+    if not rows:
+        return
+    async with DatabaseSession() as session:
+        await session.executemany(
+            "INSERT INTO chat_messages (session_id, role, content, metadata) VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+
+async def save_chat_exchange(session_id: int, user_content: str, assistant_content: str):
+    """Save a user message and the assistant reply in one transaction."""
+    await save_chat_messages_bulk([
+        (session_id, "user", user_content, None),
+        (session_id, "assistant", assistant_content, None),
+    ])
+
+
 async def get_chat_history(session_id: int, limit: int = 50) -> list:
-    """Get chat history for a session."""
-    async with get_db_context() as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
+    """
+    Get chat history for a session, oldest first.
+
+    Returns {"role", "content"} dicts ready to send as LLM messages.
+    """
+    async with get_reader() as db:
+        db.row_factory = None
+        async with db.execute(
             """
-            SELECT * FROM chat_messages
-            WHERE session_id = ?
-            ORDER BY created_at DESC
-            LIMIT ?
+            SELECT role, content FROM (
+                SELECT id, created_at, role, content FROM chat_messages
+                WHERE session_id = ?
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            )
+            ORDER BY created_at, id
             """,
             (session_id, limit)
-        )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in reversed(rows)]
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
 
 
 async def save_generated_image(
@@ -437,28 +681,94 @@ async def save_generated_image(
         return session.lastrowid
 
 
+def _cache_transaction(transaction: dict) -> None:
+    _transactions_by_hash.set(transaction["tx_hash"], transaction)
+    if transaction.get("idempotency_key"):
+        _transactions_by_key.set(transaction["idempotency_key"], transaction)
+
+
+def invalidate_transaction(tx_hash: Optional[str] = None, idempotency_key: Optional[str] = None) -> None:
+    """Drop cached transaction rows after the transaction is created or modified."""
+    if tx_hash is not None:
+        _transactions_by_hash.pop(tx_hash)
+    if idempotency_key is not None:
+        _transactions_by_key.pop(idempotency_key)
+
+
 async def get_transaction_by_hash(tx_hash: str) -> Optional[dict]:
     """Fetch a transaction by its hash."""
-    async with get_db_context() as db:
+    cached = _transactions_by_hash.get(tx_hash)
+    if cached is not None:
+        return dict(cached)
+
+    async with get_reader() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
+        async with db.execute(
             "SELECT * FROM transactions WHERE tx_hash = ?",
             (tx_hash,)
-        )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        ) as cursor:
+            row = await cursor.fetchone()
+    if row is None:
+        return None
+    transaction = dict(row)
+    _cache_transaction(transaction)
+    return dict(transaction)
 
 
 async def get_transaction_by_idempotency_key(idempotency_key: str) -> Optional[dict]:
     """Fetch a transaction by idempotency key."""
-    async with get_db_context() as db:
+    cached = _transactions_by_key.get(idempotency_key)
+    if cached is not None:
+        return dict(cached)
+
+    async with get_reader() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
+        async with db.execute(
             "SELECT * FROM transactions WHERE idempotency_key = ?",
             (idempotency_key,)
-        )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        ) as cursor:
+            row = await cursor.fetchone()
+    if row is None:
+        return None
+    transaction = dict(row)
+    _cache_transaction(transaction)
+    return dict(transaction)
+
+
+async def get_transaction_by_idempotency_key_or_hash(
+    idempotency_key: Optional[str],
+    tx_hash: str,
+) -> Optional[dict]:
+    """
+    Fetch the transaction holding idempotency_key, else the one for tx_hash.
+
+    One query instead of a lookup per column; when both match different
+    rows the idempotency key row wins, so callers can detect key reuse.
+    """
+    if idempotency_key:
+        cached = _transactions_by_key.get(idempotency_key)
+    else:
+        cached = _transactions_by_hash.get(tx_hash)
+    if cached is not None:
+        return dict(cached)
+
+    async with get_reader() as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            """
+            SELECT * FROM transactions
+            WHERE idempotency_key = ? OR tx_hash = ?
+            ORDER BY idempotency_key = ? DESC
+            LIMIT 1
+            """,
+            (idempotency_key, tx_hash, idempotency_key)
+        ) as cursor:
+            row = await cursor.fetchone()
+    if row is None:
+        return None
+    transaction = dict(row)
+    _cache_transaction(transaction)
+    return dict(transaction)
 
 
 async def create_transaction(
@@ -473,15 +783,18 @@ async def create_transaction(
 ) -> int:
     """Create a new transaction record."""
     async with DatabaseSession() as session:
-        await session.execute(
+        cursor = await session.execute(
             """
             INSERT INTO transactions
             (user_id, tx_hash, tx_type, status, amount, token_address, idempotency_key, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
             """,
             (user_id, tx_hash, tx_type, status, amount, token_address, idempotency_key, metadata)
         )
-        return session.lastrowid
+        row = await cursor.fetchone()
+    invalidate_transaction(tx_hash=tx_hash, idempotency_key=idempotency_key)
+    return row[0]
 
 
 async def update_transaction_status(
@@ -492,11 +805,16 @@ async def update_transaction_status(
 ):
     """Update transaction status and metadata."""
     async with DatabaseSession() as session:
-        await session.execute(
+        cursor = await session.execute(
             """
             UPDATE transactions
             SET status = ?, confirmed_at = COALESCE(?, confirmed_at), metadata = COALESCE(?, metadata)
             WHERE tx_hash = ?
+            RETURNING idempotency_key
             """,
             (status, confirmed_at, metadata, tx_hash)
         )
+        rows = await cursor.fetchall()
+    invalidate_transaction(tx_hash=tx_hash)
+    for (idempotency_key,) in rows:
+        invalidate_transaction(idempotency_key=idempotency_key)
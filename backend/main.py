@@ -20,8 +20,10 @@ from datetime import datetime
 from typing import Any, Deque, Dict, Optional
 from uuid import uuid4
 
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+import orjson
 from web3 import Web3
 
 import aiosqlite
@@ -29,15 +31,24 @@ import aiosqlite
 from database import (
     init_db,
     close_db,
-    get_db,
     create_transaction,
     get_transaction_by_hash,
     get_transaction_by_idempotency_key,
-    update_transaction_status,
+    get_transaction_by_idempotency_key_or_hash,
+)
+from auth import (
+    authenticate_user,
+    get_current_user,
+    get_jwt_auth,
+    refresh_access_token,
+    register_user,
+    TokenResponse,
+    UserCreate,
+    UserLogin,
+    RefreshTokenRequest,
 )
-from auth import get_current_user, TokenResponse, UserCreate, UserLogin, RefreshTokenRequest
 from agent import CommerceAgent
-from blockchain import InvalidTransactionHash, normalize_tx_hash, verify_escrow_transaction
+from blockchain import InvalidTransactionHash, normalize_tx_hash, run_rpc, verify_escrow_transaction
 from universal_components import (
     init_connascence_bridge,
     init_memory_client,
@@ -71,14 +82,43 @@ memory_client = init_memory_client()
 telemetry_bridge = init_telemetry_bridge()
 connascence_bridge = init_connascence_bridge()
 
+def _encode_ws_message(message: Dict[str, Any]) -> bytes:
+    """
+    Serialize a WebSocket message to UTF-8 JSON for a binary frame.
+
+    orjson handles the common case; stdlib json covers what it rejects
+    (integers wider than 64 bits, such as wei amounts).
+    """
+    try:
+        return orjson.dumps(message)
+    except orjson.JSONEncodeError:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+_WS_TEXT_PREFIX = b'{"type":"text","content":'
+_WS_DONE_PREFIX = b'{"type":"done","message":'
+
+
+def _encode_ws_text(content: str) -> bytes:
+    """Encode a streamed text frame without building a message dict per token."""
+    return _WS_TEXT_PREFIX + orjson.dumps(content) + b"}"
+
+
+def _encode_ws_done(message: str) -> bytes:
+    """Encode the end-of-stream frame carrying the full response."""
+    return _WS_DONE_PREFIX + orjson.dumps(message) + b"}"
+
+
 # WebSocket connection manager (adapted from library)
 class ConnectionManager:
     """WebSocket connection manager with room support."""
 
     def __init__(self):
+        # Both maps are only touched from the event loop and never across an
+        # await, so updates are atomic and need no lock
         self._connections: Dict[str, WebSocket] = {}
-        self._user_connections: Dict[str, set] = {}
-        self._lock = asyncio.Lock()
+        # Insertion-ordered dicts used as sets of connection ids
+        self._user_connections: Dict[str, Dict[str, None]] = {}
 
     @property
     def active_connections(self) -> int:
@@ -94,47 +134,63 @@ class ConnectionManager:
         """Accept and register a WebSocket connection."""
         await websocket.accept(subprotocol=subprotocol)
 
-        async with self._lock:
-            self._connections[connection_id] = websocket
-
-            if user_id:
-                if user_id not in self._user_connections:
-                    self._user_connections[user_id] = set()
-                self._user_connections[user_id].add(connection_id)
+        self._connections[connection_id] = websocket
+        if user_id:
+            self._user_connections.setdefault(user_id, {})[connection_id] = None
 
-        logger.info(f"WebSocket connected: {connection_id}, user={user_id}")
+        logger.info("WebSocket connected: %s, user=%s", connection_id, user_id)
 
     def disconnect(self, connection_id: str, user_id: Optional[str] = None):
         """Remove a WebSocket connection."""
         self._connections.pop(connection_id, None)
 
         if user_id and user_id in self._user_connections:
-            self._user_connections[user_id].discard(connection_id)
+            self._user_connections[user_id].pop(connection_id, None)
             if not self._user_connections[user_id]:
                 del self._user_connections[user_id]
 
-        logger.info(f"WebSocket disconnected: {connection_id}")
+        logger.info("WebSocket disconnected: %s", connection_id)
 
     async def send_personal(self, connection_id: str, message: dict):
         """Send message to a specific connection."""
         websocket = self._connections.get(connection_id)
         if websocket:
             try:
-                await websocket.send_json(message)
+                await websocket.send_bytes(_encode_ws_message(message))
             except Exception as e:
-                logger.error(f"Failed to send message: {e}")
+                logger.error("Failed to send message: %s", e)
                 self.disconnect(connection_id)
 
     async def send_to_user(self, user_id: str, message: dict):
         """Send message to all connections of a user."""
-        connection_ids = self._user_connections.get(user_id, set())
-        for conn_id in connection_ids:
-            await self.send_personal(conn_id, message)
+        targets = [
+            (conn_id, websocket)
+            for conn_id in self._user_connections.get(user_id, ())
+            if (websocket := self._connections.get(conn_id)) is not None
+        ]
+        await self._send_many(targets, message, user_id)
 
     async def broadcast(self, message: dict):
         """Broadcast message to all connections."""
-        for conn_id in list(self._connections.keys()):
-            await self.send_personal(conn_id, message)
+        await self._send_many(list(self._connections.items()), message)
+
+    async def _send_many(self, targets: list, message: dict, user_id: Optional[str] = None):
+        """
+        Send to (connection_id, websocket) pairs concurrently so one slow
+        socket cannot stall the rest.
+        """
+        if not targets:
+            return
+        # Encode once for every recipient
+        payload = _encode_ws_message(message)
+        results = await asyncio.gather(
+            *(websocket.send_bytes(payload) for _, websocket in targets),
+            return_exceptions=True,
+        )
+        for (conn_id, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to send message: %s", result)
+                self.disconnect(conn_id, user_id)
 
 
 # Global instances
@@ -175,6 +231,16 @@ async def paid_api_rate_limit(request: Request) -> None:
     _consume_rate_limit(request, "paid-api", max_requests=5, window_seconds=60)
 
 
+async def require_agent() -> CommerceAgent:
+    """Return the commerce agent, or 503 until startup has created it."""
+    if commerce_agent is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Agent not initialized"
+        )
+    return commerce_agent
+
+
 def _current_user_id(current_user: dict) -> int:
     """Return the numeric database user id from an authenticated JWT payload."""
     try:
@@ -196,12 +262,16 @@ async def lifespan(app: FastAPI):
     await init_db()
     commerce_agent = CommerceAgent()
     await commerce_agent.initialize()
+    heartbeat_task = asyncio.create_task(_heartbeat(ws_manager))
     logger.info("Backend started successfully")
 
     yield
 
     # Shutdown
     logger.info("Shutting down backend...")
+    heartbeat_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await heartbeat_task
     await close_db()
     if commerce_agent:
         await commerce_agent.shutdown()
@@ -214,6 +284,8 @@ app = FastAPI(
     description="AI-powered shopping assistant with blockchain integration",
     version="1.0.0",
     lifespan=lifespan,
+    # Response models are encoded with orjson instead of stdlib json
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware - Security: never combine wildcard origins with credentials.
@@ -239,7 +311,8 @@ _allow_credentials = "*" not in _cors_origins
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=_cors_origins,
+    # Starlette checks each request's Origin with `in`; make that a set lookup
+    allow_origins=frozenset(_cors_origins),
     allow_credentials=_allow_credentials,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["Authorization", "Content-Type", "X-Requested-With"],
@@ -250,19 +323,30 @@ app.add_middleware(
 # Health Check Endpoints
 # ==============================================================================
 
+# Liveness probes arrive every few seconds; reuse the encoded body briefly
+HEALTH_CACHE_SECONDS = 1.0
+_health_cache: tuple[float, bytes] = (float("-inf"), b"")
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Health check endpoint for Railway deployment."""
-    return HealthResponse(
-        status="healthy",
-        version="1.0.0",
-        timestamp=datetime.utcnow().isoformat(),
-        services={
-            "database": "connected",
-            "websocket": f"{ws_manager.active_connections} connections",
-            "agent": "ready" if commerce_agent else "not_initialized",
-        }
-    )
+    global _health_cache
+    now = time.monotonic()
+    built_at, body = _health_cache
+    if now - built_at >= HEALTH_CACHE_SECONDS:
+        body = orjson.dumps({
+            "status": "healthy",
+            "version": "1.0.0",
+            "timestamp": datetime.utcnow().isoformat(),
+            "services": {
+                "database": "connected",
+                "websocket": f"{ws_manager.active_connections} connections",
+                "agent": "ready" if commerce_agent else "not_initialized",
+            },
+        })
+        _health_cache = (now, body)
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/", tags=["Health"])
@@ -283,33 +367,30 @@ async def root():
 async def register(
     user_data: UserCreate,
     _: None = Depends(auth_rate_limit),
-    db=Depends(get_db),
 ):
     """Register a new user."""
-    from auth import register_user
-    return await register_user(user_data, db)
+    tokens = await register_user(user_data)
+    return ORJSONResponse(tokens.model_dump())
 
 
 @app.post("/auth/login", response_model=TokenResponse, tags=["Authentication"])
 async def login(
     credentials: UserLogin,
     _: None = Depends(auth_rate_limit),
-    db=Depends(get_db),
 ):
     """Login and get access token. Accepts JSON body with email and password."""
-    from auth import authenticate_user
-    return await authenticate_user(credentials, db)
+    tokens = await authenticate_user(credentials)
+    return ORJSONResponse(tokens.model_dump())
 
 
 @app.post("/auth/refresh", response_model=TokenResponse, tags=["Authentication"])
 async def refresh_token(
     request: RefreshTokenRequest,
     _: None = Depends(auth_rate_limit),
-    db=Depends(get_db),
 ):
     """Refresh access token. Accepts JSON body with refresh_token."""
-    from auth import refresh_access_token
-    return await refresh_access_token(request.refresh_token, db)
+    tokens = await refresh_access_token(request.refresh_token)
+    return ORJSONResponse(tokens.model_dump())
 
 
 # ==============================================================================
@@ -320,27 +401,24 @@ async def refresh_token(
 async def chat(
     message: ChatMessage,
     current_user: dict = Depends(get_current_user),
-    db=Depends(get_db),
+    agent: CommerceAgent = Depends(require_agent),
 ):
     """Process a chat message through the AI agent."""
-    if not commerce_agent:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Agent not initialized"
-        )
-
-    response = await commerce_agent.process_message(
+    response = await agent.process_message(
         message=message.content,
         user_id=current_user["sub"],
         context=message.context,
     )
 
-    return ChatResponse(
+    chat_response = ChatResponse(
         message=response["message"],
         actions=response.get("actions", []),
         products=response.get("products", []),
         images=response.get("images", []),
     )
+    # Validated once here; returning a response skips FastAPI re-validating
+    # the model against response_model
+    return ORJSONResponse(chat_response.model_dump())
 
 
 # ==============================================================================
@@ -351,15 +429,10 @@ async def chat(
 async def search_products(
     search: ProductSearch,
     current_user: dict = Depends(get_current_user),
+    agent: CommerceAgent = Depends(require_agent),
 ):
     """Search for products."""
-    if not commerce_agent:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Agent not initialized"
-        )
-
-    results = await commerce_agent.search_products(
+    results = await agent.search_products(
         query=search.query,
         category=search.category,
         max_price=search.max_price,
@@ -368,23 +441,18 @@ async def search_products(
         limit=search.limit,
     )
 
-    return [ProductResponse(**p) for p in results]
+    return ORJSONResponse([ProductResponse(**p).model_dump() for p in results])
 
 
 @app.post("/products/compare", response_model=PriceComparisonResponse, tags=["Products"])
 async def compare_prices(
     request: PriceComparisonRequest,
     current_user: dict = Depends(get_current_user),
+    agent: CommerceAgent = Depends(require_agent),
 ):
     """Compare prices across multiple sources."""
-    if not commerce_agent:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Agent not initialized"
-        )
-
-    comparison = await commerce_agent.compare_prices(request.product_id)
-    return PriceComparisonResponse(**comparison)
+    comparison = await agent.compare_prices(request.product_id)
+    return ORJSONResponse(PriceComparisonResponse(**comparison).model_dump())
 
 
 # ==============================================================================
@@ -406,28 +474,22 @@ async def verify_transaction(
             detail=str(exc),
         ) from None
 
-    if payload.idempotency_key:
-        existing = await get_transaction_by_idempotency_key(payload.idempotency_key)
-        if existing:
-            if existing.get("tx_hash") != tx_hash:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="Idempotency key already used with different transaction."
-                )
-            return TransactionVerifyResponse(
-                tx_hash=existing["tx_hash"],
-                status=TransactionStatus(existing["status"]),
-                verified=existing["status"] == TransactionStatus.CONFIRMED.value,
-                amount=existing.get("amount"),
+    existing = await get_transaction_by_idempotency_key_or_hash(payload.idempotency_key, tx_hash)
+    if existing:
+        if (
+            payload.idempotency_key
+            and existing.get("idempotency_key") == payload.idempotency_key
+            and existing.get("tx_hash") != tx_hash
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Idempotency key already used with different transaction."
             )
-
-    existing_tx = await get_transaction_by_hash(tx_hash)
-    if existing_tx:
         return TransactionVerifyResponse(
-            tx_hash=existing_tx["tx_hash"],
-            status=TransactionStatus(existing_tx["status"]),
-            verified=existing_tx["status"] == TransactionStatus.CONFIRMED.value,
-            amount=existing_tx.get("amount"),
+            tx_hash=existing["tx_hash"],
+            status=TransactionStatus(existing["status"]),
+            verified=existing["status"] == TransactionStatus.CONFIRMED.value,
+            amount=existing.get("amount"),
         )
 
     escrow_address = payload.escrow_address or os.getenv("ESCROW_CONTRACT")
@@ -441,7 +503,9 @@ async def verify_transaction(
     if payload.amount is not None:
         expected_amount = Web3.to_wei(payload.amount, "ether")
 
-    verification = verify_escrow_transaction(
+    # web3 RPC calls block; keep them off the event loop
+    verification = await run_rpc(
+        verify_escrow_transaction,
         tx_hash=tx_hash,
         escrow_address=escrow_address,
         expected_buyer=payload.buyer,
@@ -496,9 +560,6 @@ async def verify_transaction(
             detail="Transaction already exists with conflicting data."
         )
 
-    if status_value in {"confirmed", "failed"}:
-        await update_transaction_status(tx_hash, status_value, metadata=metadata)
-
     return TransactionVerifyResponse(
         tx_hash=tx_hash,
         status=TransactionStatus(status_value),
@@ -520,21 +581,17 @@ async def generate_image(
     request: ImageGenerationRequest,
     _: None = Depends(paid_api_rate_limit),
     current_user: dict = Depends(get_current_user),
+    agent: CommerceAgent = Depends(require_agent),
 ):
     """Generate product image using Replicate."""
-    if not commerce_agent:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Agent not initialized"
-        )
-
-    result = await commerce_agent.generate_product_image(
+    result = await agent.generate_product_image(
         prompt=request.prompt,
         style=request.style,
         aspect_ratio=request.aspect_ratio,
+        user_id=current_user["sub"],
     )
 
-    return ImageGenerationResponse(**result)
+    return ORJSONResponse(ImageGenerationResponse(**result).model_dump())
 
 
 # ==============================================================================
@@ -543,7 +600,18 @@ async def generate_image(
 
 async def _send_ws(websocket: WebSocket, message: Dict[str, Any]) -> None:
     """Send a JSON message over WebSocket."""
-    await websocket.send_json(message)
+    await websocket.send_bytes(_encode_ws_message(message))
+
+
+async def _receive_ws(websocket: WebSocket) -> Any:
+    """Receive a JSON message over WebSocket from a text or binary frame."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    raw = message.get("text")
+    if raw is None:
+        raw = message.get("bytes")
+    return orjson.loads(raw)
 
 
 async def _stream_agent_response(
@@ -561,65 +629,109 @@ async def _stream_agent_response(
         return
 
     full_response: list[str] = []
+    # Frames go through a queue so text produced while a send is blocked
+    # is merged into one frame instead of queuing many small ones
+    outbox: asyncio.Queue = asyncio.Queue()
+    sender = asyncio.create_task(_drain_ws_outbox(websocket, outbox))
 
-    async for chunk in commerce_agent.stream_response(
-        message=content,
-        user_id=user_id,
-        context=context,
-    ):
-        metadata = chunk.get("metadata", {})
-        chunk_type = metadata.get("type", "text")
+    try:
+        async for chunk in commerce_agent.stream_response(
+            message=content,
+            user_id=user_id,
+            context=context,
+        ):
+            if sender.done():
+                # The socket failed; surface the send error
+                await sender
+
+            metadata = chunk.get("metadata", {})
+            chunk_type = metadata.get("type", "text")
+
+            if chunk_type == "tool_start":
+                outbox.put_nowait({
+                    "type": "tool_start",
+                    "tool": metadata.get("tool"),
+                    "args": metadata.get("args"),
+                })
+                continue
 
-        if chunk_type == "tool_start":
-            await _send_ws(websocket, {
-                "type": "tool_start",
-                "tool": metadata.get("tool"),
-                "args": metadata.get("args"),
-            })
-            continue
+            if chunk_type == "tool_result":
+                _queue_tool_payloads(outbox, metadata)
+                continue
 
-        if chunk_type == "tool_result":
-            await _emit_tool_payloads(websocket, metadata)
-            continue
+            text = chunk.get("content", "")
+            if text:
+                full_response.append(text)
+                # Text is queued bare and framed with a prebuilt template
+                outbox.put_nowait(text)
 
-        text = chunk.get("content", "")
-        if text:
-            full_response.append(text)
-            await _send_ws(websocket, {
-                "type": "text",
-                "content": text,
-            })
+        outbox.put_nowait(_OUTBOX_END)
+        await sender
+    finally:
+        if not sender.done():
+            sender.cancel()
+            with suppress(asyncio.CancelledError):
+                await sender
 
-    await _send_ws(websocket, {
-        "type": "done",
-        "message": "".join(full_response),
-    })
+    await websocket.send_bytes(_encode_ws_done("".join(full_response)))
+
+
+_OUTBOX_END = object()
+WS_TEXT_BATCH_MAX = 32
 
 
-async def _emit_tool_payloads(websocket: WebSocket, metadata: Dict[str, Any]) -> None:
-    """Send tool result payloads to the client."""
-    await _send_ws(websocket, {
+async def _drain_ws_outbox(websocket: WebSocket, outbox: asyncio.Queue) -> None:
+    """Send queued frames in order, merging text frames that piled up meanwhile."""
+    carry = None
+    while True:
+        message = carry or await outbox.get()
+        carry = None
+        if message is _OUTBOX_END:
+            return
+
+        if isinstance(message, str):
+            parts = [message]
+            while len(parts) < WS_TEXT_BATCH_MAX and not outbox.empty():
+                following = outbox.get_nowait()
+                if not isinstance(following, str):
+                    carry = following
+                    break
+                parts.append(following)
+            await websocket.send_bytes(_encode_ws_text("".join(parts)))
+            continue
+
+        await _send_ws(websocket, message)
+
+
+def _queue_tool_payloads(outbox: asyncio.Queue, metadata: Dict[str, Any]) -> None:
+    """Queue tool result payloads for the client."""
+    outbox.put_nowait({
         "type": "tool_result",
         "tool": metadata.get("tool"),
         "result": metadata.get("result"),
     })
     if metadata.get("products"):
-        await _send_ws(websocket, {
+        outbox.put_nowait({
             "type": "products",
             "data": metadata.get("products"),
         })
     if metadata.get("image"):
-        await _send_ws(websocket, {
+        outbox.put_nowait({
             "type": "image",
             "data": metadata.get("image"),
         })
 
 
-async def _heartbeat(websocket: WebSocket, interval: int = 20) -> None:
-    """Send periodic ping messages to keep the connection alive."""
+async def _heartbeat(manager: ConnectionManager, interval: int = 20) -> None:
+    """
+    Ping every open connection periodically to keep them alive.
+
+    One task serves all connections: the ping is encoded once per tick and
+    sockets that fail the send are dropped from the manager.
+    """
     while True:
         await asyncio.sleep(interval)
-        await _send_ws(websocket, {"type": "ping"})
+        await manager.broadcast({"type": "ping"})
 
 
 WEBSOCKET_AUTH_SUBPROTOCOL = "arc.jwt"
@@ -663,8 +775,6 @@ async def _authenticate_websocket(websocket: WebSocket, path_user_id: str) -> tu
         return None, None
 
     try:
-        from auth import get_jwt_auth
-
         jwt_auth = get_jwt_auth()
         payload = jwt_auth.verify_token(token)
         if not payload:
@@ -683,10 +793,10 @@ async def _authenticate_websocket(websocket: WebSocket, path_user_id: str) -> tu
             await websocket.close(code=4003, reason="User ID mismatch")
             return None, None
 
-        logger.info(f"WebSocket authenticated: user_id={authenticated_user_id}")
+        logger.info("WebSocket authenticated: user_id=%s", authenticated_user_id)
         return str(authenticated_user_id), subprotocol
     except Exception as e:
-        logger.error(f"WebSocket auth failed: {e}")
+        logger.error("WebSocket auth failed: %s", e)
         await websocket.close(code=4002, reason="Authentication failed")
         return None, None
 
@@ -712,7 +822,6 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
     {"type": "done", "message": "full response"}
     """
     connection_id = websocket.query_params.get("connection_id") or str(uuid4())
-    heartbeat_task: Optional[asyncio.Task] = None
     stream_task: Optional[asyncio.Task] = None
 
     authenticated_user_id, subprotocol = await _authenticate_websocket(websocket, user_id)
@@ -722,10 +831,9 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
 
     try:
         await ws_manager.connect(websocket, connection_id, user_id, subprotocol=subprotocol)
-        heartbeat_task = asyncio.create_task(_heartbeat(websocket))
 
         while True:
-            receive_task = asyncio.create_task(websocket.receive_json())
+            receive_task = asyncio.create_task(_receive_ws(websocket))
             wait_for = {receive_task}
             if stream_task:
                 wait_for.add(stream_task)
@@ -776,9 +884,9 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
             )
 
     except WebSocketDisconnect:
-        logger.info(f"WebSocket {connection_id} disconnected")
+        logger.info("WebSocket %s disconnected", connection_id)
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
         try:
             await _send_ws(websocket, {
                 "type": "error",
@@ -787,8 +895,6 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
         except Exception:
             pass
     finally:
-        if heartbeat_task:
-            heartbeat_task.cancel()
         if stream_task and not stream_task.done():
             stream_task.cancel()
             with suppress(asyncio.CancelledError):
@@ -804,9 +910,13 @@ if __name__ == "__main__":
     import uvicorn
 
     port = int(os.getenv("PORT", 8000))
+    # uvloop/httptools are Linux/macOS only; "auto" falls back to asyncio/h11
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
         reload=os.getenv("ENV", "development") == "development",
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        ws=os.getenv("UVICORN_WS", "auto"),
     )
@@ -0,0 +1,79 @@
+"""Conversation history handling for the commerce agent."""
+
+import pytest
+
+from agent import estimate_tokens, trim_history
+
+
+def _turn(role: str, content: str) -> dict:
+    return {"role": role, "content": content}
+
+
+def test_trim_history_keeps_newest_turns_within_budget():
+    history = [
+        _turn("user", "a" * 400),
+        _turn("assistant", "b" * 400),
+        _turn("user", "c" * 40),
+        _turn("assistant", "d" * 40),
+    ]
+
+    trimmed = trim_history(history, max_tokens=estimate_tokens("c" * 40) * 2)
+
+    assert trimmed == history[2:]
+
+
+def test_trim_history_drops_everything_when_newest_turn_exceeds_budget():
+    history = [_turn("user", "short"), _turn("assistant", "x" * 1000)]
+
+    assert trim_history(history, max_tokens=10) == []
+
+
+def test_trim_history_keeps_short_sessions_intact():
+    history = [_turn("user", "hi"), _turn("assistant", "hello")]
+
+    assert trim_history(history, max_tokens=2048) == history
+
+
+@pytest.mark.anyio
+async def test_process_message_sends_budgeted_history(monkeypatch):
+    import agent as agent_module
+
+    long_turn = _turn("assistant", "z" * (agent_module.MAX_HISTORY_TOKENS * agent_module.CHARS_PER_TOKEN))
+    recent_turn = _turn("user", "recent question")
+
+    async def fake_history(session_id, limit=10):
+        return [long_turn, recent_turn]
+
+    async def fake_save(*args, **kwargs):
+        return 1
+
+    monkeypatch.setattr(agent_module, "get_chat_history", fake_history)
+    monkeypatch.setattr(agent_module, "save_chat_exchange", fake_save)
+    monkeypatch.setattr(agent_module, "MODEL_NAME", "openai/gpt-4o-mini")
+
+    commerce_agent = agent_module.CommerceAgent()
+    commerce_agent.client = object()
+    sent = []
+
+    async def fake_call_llm(messages, context):
+        sent.append(messages)
+        return {"message": "ok", "actions": [], "products": [], "images": []}
+
+    monkeypatch.setattr(commerce_agent, "_call_llm", fake_call_llm)
+
+    await commerce_agent.process_message("next question", user_id="1", session_id=7)
+
+    assert sent[0] == [recent_turn, _turn("user", "next question")]
+
+
+def test_history_cache_breakpoint_marks_newest_turn_for_anthropic(monkeypatch):
+    import agent as agent_module
+
+    history = [_turn("user", "first"), _turn("assistant", "reply")]
+    monkeypatch.setattr(agent_module, "MODEL_NAME", "anthropic/claude-sonnet-4")
+
+    marked = agent_module.CommerceAgent._mark_history_cache_breakpoint(history)
+
+    assert marked[0] is history[0]
+    assert marked[1]["content"][0]["cache_control"] == agent_module.PROMPT_CACHE_CONTROL
+    assert history[1] == _turn("assistant", "reply")
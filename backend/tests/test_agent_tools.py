@@ -0,0 +1,441 @@
+"""Agent tool dispatch regressions."""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.anyio
+async def test_emit_tool_results_runs_tools_concurrently_in_call_order(monkeypatch):
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    started = []
+    both_started = asyncio.Event()
+
+    async def fake_execute_tool(tool_name, tool_input, context=None):
+        started.append(tool_name)
+        if len(started) == 2:
+            both_started.set()
+        # Each tool waits until the other has started, so serial execution would hang.
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        if tool_name == "compare_prices":
+            raise RuntimeError("price source down")
+        return {"tool": tool_name}
+
+    monkeypatch.setattr(agent, "_execute_tool", fake_execute_tool)
+
+    tool_calls = {
+        "call_0": {"name": "generate_image", "args": '{"prompt": "neon sneaker"}'},
+        "call_1": {"name": "compare_prices", "args": '{"product_name": "sneaker"}'},
+    }
+    chunks = [
+        chunk
+        async for chunk in agent._emit_tool_results(tool_calls, AgentContext(user_id="1"))
+    ]
+
+    assert [chunk["metadata"]["tool"] for chunk in chunks] == ["generate_image", "compare_prices"]
+    assert chunks[0]["metadata"]["image"] == {"tool": "generate_image"}
+    assert chunks[1]["metadata"]["result"] == {"error": "price source down"}
+
+
+@pytest.mark.anyio
+async def test_call_llm_reports_a_failed_tool_without_dropping_its_siblings(monkeypatch):
+    from types import SimpleNamespace
+
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    finished = []
+
+    async def fake_search(**kwargs):
+        await asyncio.sleep(0.01)
+        finished.append("search_products")
+        return [{"id": "jacket_1"}]
+
+    async def fake_create_completion(full_messages, speculative=False):
+        message = SimpleNamespace(
+            content="Here you go.",
+            tool_calls=[
+                _tool_call_delta("call_0", "search_products", '{"query": "jacket"}'),
+                _tool_call_delta("call_1", "summon_courier", "{}"),
+            ],
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(agent, "_handle_search_products", fake_search)
+    agent._register_tools()
+    monkeypatch.setattr(agent, "_create_completion", fake_create_completion)
+
+    result = await agent._call_llm(
+        [{"role": "user", "content": "jackets"}], AgentContext(user_id="1")
+    )
+
+    assert finished == ["search_products"]
+    assert result["products"] == [{"id": "jacket_1"}]
+    assert "summon_courier failed: Unknown tool: summon_courier" in result["message"]
+
+
+def _stream_chunk(content=None, tool_call=None):
+    from types import SimpleNamespace
+
+    delta = SimpleNamespace(content=content, tool_calls=[tool_call] if tool_call else None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _tool_call_delta(call_id, name=None, arguments=None):
+    from types import SimpleNamespace
+
+    return SimpleNamespace(
+        id=call_id,
+        index=0,
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+@pytest.mark.anyio
+async def test_stream_yields_tool_result_before_stream_finishes(monkeypatch):
+    from types import SimpleNamespace
+
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+
+    async def fake_execute_tool(tool_name, tool_input, context=None):
+        return {"tool": tool_name, "args": dict(tool_input)}
+
+    async def fake_stream():
+        yield _stream_chunk(tool_call=_tool_call_delta("call_a", "search_products", '{"query": '))
+        yield _stream_chunk(tool_call=_tool_call_delta("call_a", arguments='"jacket"}'))
+        await asyncio.sleep(0.01)
+        yield _stream_chunk(content="Here are some jackets.")
+
+    async def create(**kwargs):
+        return fake_stream()
+
+    agent.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    monkeypatch.setattr(agent, "_execute_tool", fake_execute_tool)
+
+    chunks = [
+        chunk
+        async for chunk in agent._stream_openrouter("jackets", AgentContext(user_id="1"))
+    ]
+    types = [chunk["metadata"]["type"] for chunk in chunks]
+
+    assert types.index("tool_result") < types.index("text")
+    assert chunks[types.index("tool_result")]["metadata"]["products"]["args"]["query"] == "jacket"
+
+
+@pytest.mark.anyio
+async def test_execute_tool_rejects_arguments_that_violate_the_schema():
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+
+    result = await agent._execute_tool(
+        "generate_image",
+        {"prompt": "neon sneaker", "style": "watercolor"},
+    )
+
+    assert "Invalid parameters" in result["error"]
+
+
+@pytest.mark.anyio
+async def test_speculative_completion_returns_first_model_and_cancels_the_other(monkeypatch):
+    from types import SimpleNamespace
+
+    import agent as agent_module
+
+    monkeypatch.setattr(agent_module, "FALLBACK_MODEL_NAME", "fast/model")
+    commerce_agent = agent_module.CommerceAgent()
+    slow_cancelled = asyncio.Event()
+
+    async def create(messages, model, **kwargs):
+        if model == "fast/model":
+            return SimpleNamespace(model=model)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            slow_cancelled.set()
+            raise
+
+    commerce_agent.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    response = await commerce_agent._create_completion([], speculative=True)
+    await asyncio.sleep(0)
+
+    assert response.model == "fast/model"
+    assert slow_cancelled.is_set()
+
+
+@pytest.mark.anyio
+async def test_execute_tool_reuses_cached_result_for_equivalent_calls():
+    from dataclasses import replace
+
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+    calls = []
+
+    async def fake_search(query, user_id=None, **kwargs):
+        calls.append((query, user_id))
+        if query == "broken":
+            return {"error": "source down"}
+        return {"query": query, "products": []}
+
+    tool = agent._tools_by_name["search_products"]
+    agent._tools_by_name["search_products"] = replace(tool, handler=fake_search)
+
+    first = await agent._execute_tool(
+        "search_products", {"query": "Neon  Sneaker"}, AgentContext(user_id="1")
+    )
+    second = await agent._execute_tool(
+        "search_products", {"query": "neon sneaker"}, AgentContext(user_id="2")
+    )
+    await agent._execute_tool("search_products", {"query": "broken"})
+    await agent._execute_tool("search_products", {"query": "broken"})
+
+    # Hits are fresh copies, so mutating one cannot poison the cache
+    assert second == first and second is not first
+    second["products"].append({"id": "mutated"})
+    third = await agent._execute_tool("search_products", {"query": "neon sneaker"})
+    assert third["products"] == []
+    assert calls == [("Neon  Sneaker", "1"), ("broken", None), ("broken", None)]
+    assert agent.tool_cache_stats()["search_products"]["hits"] == 2
+
+
+@pytest.mark.anyio
+async def test_cached_image_render_still_saves_a_record_per_user(monkeypatch):
+    from types import SimpleNamespace
+
+    import agent as agent_module
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+    renders, saved = [], []
+
+    async def generate_image(**kwargs):
+        renders.append(kwargs)
+        return {"image_url": "https://example.com/sneaker.png", "model": "flux"}
+
+    async def save_generated_image(user_id, **kwargs):
+        saved.append(user_id)
+
+    agent.replicate = SimpleNamespace(generate_image=generate_image)
+    monkeypatch.setattr(agent_module, "save_generated_image", save_generated_image)
+
+    for user_id in ("1", "2"):
+        result = await agent._execute_tool(
+            "generate_image", {"prompt": "neon sneaker"}, AgentContext(user_id=user_id)
+        )
+        assert result["image_url"] == "https://example.com/sneaker.png"
+
+    assert len(renders) == 1
+    assert saved == ["1", "2"]
+
+
+@pytest.mark.anyio
+async def test_direct_search_shares_the_tool_cache(monkeypatch):
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return [{"id": "p1"}]
+
+    monkeypatch.setattr(agent, "_handle_search_products", fake_search)
+
+    first = await agent.search_products("Red  Jacket", max_price=100)
+    second = await agent.search_products("red jacket", max_price=100)
+
+    assert second == first and second is not first
+    assert calls == [{"query": "Red  Jacket", "max_price": 100, "sort_by": "relevance", "limit": 20}]
+
+
+@pytest.mark.anyio
+async def test_price_comparisons_bypass_the_tool_cache(monkeypatch):
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    calls = []
+
+    async def fake_compare(**kwargs):
+        calls.append(kwargs)
+        return {"product_name": kwargs["product_name"], "sources": [], "cached": False}
+
+    monkeypatch.setattr(agent, "_handle_compare_prices", fake_compare)
+
+    await agent.compare_prices("prod_001")
+    await agent.compare_prices("prod_001")
+
+    # PriceComparer keeps its own cache and reports hits through "cached"
+    assert len(calls) == 2
+    assert "compare_prices" not in agent.tool_caches
+
+
+@pytest.mark.anyio
+async def test_direct_image_generation_reuses_cached_results(monkeypatch):
+    from types import SimpleNamespace
+
+    import agent as agent_module
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    renders, saved = [], []
+
+    async def generate_image(**kwargs):
+        renders.append(kwargs)
+        if len(renders) == 1:
+            return {"error": "Replicate unavailable", "image_url": None}
+        return {"image_url": "https://example.com/sneaker.png", "prompt": kwargs["prompt"]}
+
+    async def save_generated_image(user_id, **kwargs):
+        saved.append(user_id)
+
+    agent.replicate = SimpleNamespace(generate_image=generate_image)
+    monkeypatch.setattr(agent_module, "save_generated_image", save_generated_image)
+
+    # Failures are not cached, so the retry reaches Replicate
+    assert (await agent.generate_product_image("Neon sneaker", user_id="1"))["error"]
+    first = await agent.generate_product_image("Neon sneaker", user_id="1")
+    second = await agent.generate_product_image("neon  sneaker", user_id="2")
+    await agent.generate_product_image("neon sneaker", aspect_ratio="16:9")
+
+    assert second == first
+    assert len(renders) == 3
+    # A cached render still records the image for the user who asked
+    assert saved == ["1", "2"]
+
+
+@pytest.mark.anyio
+async def test_stream_coalesces_small_text_deltas(monkeypatch):
+    from types import SimpleNamespace
+
+    import agent as agent_module
+    from agent import AgentContext, CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+
+    async def fake_stream():
+        for word in ("Here ", "are ", "some ", "jackets."):
+            yield _stream_chunk(content=word)
+
+    async def create(**kwargs):
+        return fake_stream()
+
+    agent.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    # A question, so the forced image fallback does not add a tool chunk
+    chunks = [
+        chunk
+        async for chunk in agent._stream_openrouter("any jackets?", AgentContext(user_id="1"))
+    ]
+
+    assert [chunk["content"] for chunk in chunks] == ["Here are some jackets."]
+
+    # Once the delay bound has passed, buffered text no longer waits for more
+    monkeypatch.setattr(agent_module, "STREAM_TEXT_MAX_DELAY_SECONDS", 0)
+    chunks = [
+        chunk
+        async for chunk in agent._stream_openrouter("any jackets?", AgentContext(user_id="1"))
+    ]
+
+    assert [chunk["content"] for chunk in chunks] == ["Here ", "are ", "some ", "jackets."]
+
+
+@pytest.mark.anyio
+async def test_stream_flushes_buffered_text_when_the_model_stalls(monkeypatch):
+    from types import SimpleNamespace
+
+    import agent as agent_module
+    from agent import AgentContext, CommerceAgent
+
+    monkeypatch.setattr(agent_module, "STREAM_TEXT_MAX_DELAY_SECONDS", 0.01)
+    agent = CommerceAgent()
+    agent._register_tools()
+    resume = asyncio.Event()
+
+    async def fake_stream():
+        yield _stream_chunk(content="Hel")
+        await resume.wait()
+        yield _stream_chunk(content="lo")
+
+    async def create(**kwargs):
+        return fake_stream()
+
+    agent.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    stream = agent._stream_openrouter("any jackets?", AgentContext(user_id="1"))
+    # The partial text arrives while the model is still stalled
+    first = await asyncio.wait_for(stream.__anext__(), timeout=1)
+    resume.set()
+    rest = [chunk async for chunk in stream]
+
+    assert first["content"] == "Hel"
+    assert [chunk["content"] for chunk in rest] == ["lo"]
+
+
+@pytest.mark.anyio
+async def test_fast_route_dispatches_search_without_calling_the_llm(monkeypatch):
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+    agent.client = object()
+
+    async def fail_call_llm(messages, context):
+        raise AssertionError("fast-routed message reached the LLM")
+
+    monkeypatch.setattr(agent, "_call_llm", fail_call_llm)
+
+    response = await agent.process_message("find cyberpunk jacket under $1", user_id="1")
+
+    assert response["actions"] == [{"type": "search", "query": "cyberpunk jacket"}]
+    assert [product["id"] for product in response["products"]] == ["demo_jacket_001"]
+    assert agent.fast_route_hits == 1
+
+
+@pytest.mark.anyio
+async def test_fast_route_leaves_questions_and_empty_searches_to_the_llm(monkeypatch):
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    agent._register_tools()
+    agent.client = object()
+    llm_messages = []
+
+    async def fake_call_llm(messages, context):
+        llm_messages.append(messages[-1]["content"])
+        return {"message": "Escrow holds funds.", "actions": [], "products": [], "images": []}
+
+    monkeypatch.setattr(agent, "_call_llm", fake_call_llm)
+
+    assert agent._fast_route("find out how escrow works") is None
+    assert agent._fast_route("search for the cheapest way to pay") is None
+    assert agent._fast_route("find me a gift for my mom who likes gardening") is None
+    assert agent._fast_route("search for something cheaper than the last one") is None
+    assert agent._fast_route("find headphones and compare them with the sony ones") is None
+    # Stopwords are dropped so they cannot substring-match every product
+    assert agent._fast_route("find me a jacket") == ("search_products", {"query": "jacket"})
+
+    # A search-shaped message that matches nothing still reaches the model
+    response = await agent.process_message("find zzyzx gizmo", user_id="1")
+
+    assert response["message"] == "Escrow holds funds."
+    assert llm_messages == ["find zzyzx gizmo"]
+    assert agent.fast_route_hits == 0
@@ -0,0 +1,86 @@
+"""Escrow verification regressions."""
+
+from types import SimpleNamespace
+
+
+def test_batch_verification_keeps_request_order_and_isolates_failures(monkeypatch):
+    import blockchain
+    from web3.exceptions import TransactionNotFound
+
+    mined = "0x" + "a" * 64
+    unmined = "0x" + "b" * 64
+    fetched = []
+
+    def get_transaction_receipt(tx_hash):
+        fetched.append(tx_hash)
+        if tx_hash == unmined:
+            raise TransactionNotFound("not mined")
+        return SimpleNamespace(status=0)
+
+    fake_w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_receipt=get_transaction_receipt))
+    monkeypatch.setattr(blockchain, "get_web3", lambda: fake_w3)
+
+    escrow = "0x" + "1" * 40
+    results = blockchain.verify_escrow_transactions_batch([
+        {"tx_hash": unmined, "escrow_address": escrow},
+        {"tx_hash": "bogus", "escrow_address": escrow},
+        {"tx_hash": mined, "escrow_address": escrow},
+    ])
+
+    assert [result["status"] for result in results] == ["pending", "failed", "failed"]
+    assert results[0]["reason"] == "tx_not_found"
+    assert results[1]["reason"] == "invalid_tx_hash"
+    assert fetched == [unmined, mined]
+
+
+def test_confirmed_receipts_are_served_from_cache(monkeypatch):
+    import blockchain
+
+    tx_hash = "0x" + "c" * 64
+    fetched = []
+
+    def get_transaction_receipt(requested):
+        fetched.append(requested)
+        return SimpleNamespace(status=1, to=None)
+
+    fake_w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_receipt=get_transaction_receipt))
+    monkeypatch.setattr(blockchain, "get_web3", lambda: fake_w3)
+    monkeypatch.setattr(blockchain, "_escrow_events", lambda *args: [])
+    blockchain._receipt_cache.clear()
+
+    for _ in range(2):
+        result = blockchain.verify_escrow_transaction(tx_hash, "0x" + "1" * 40)
+        assert result["reason"] == "missing_event"
+
+    assert fetched == [tx_hash]
+
+
+def test_escrow_events_only_decode_matching_logs(monkeypatch):
+    import blockchain
+
+    escrow = blockchain._checksum("0x" + "1" * 40)
+    other = blockchain._checksum("0x" + "2" * 40)
+    topic = blockchain._ESCROW_CREATED_TOPIC
+    matching = {"address": escrow, "topics": [topic]}
+    receipt = SimpleNamespace(logs=[
+        {"address": escrow, "topics": []},
+        {"address": escrow, "topics": [b"\x00" * 32]},
+        {"address": other, "topics": [topic]},
+        matching,
+    ])
+    decoded = []
+
+    def process_log(log):
+        decoded.append(log)
+        return {"args": {}}
+
+    fake_contract = SimpleNamespace(
+        events=SimpleNamespace(EscrowCreated=lambda: SimpleNamespace(process_log=process_log))
+    )
+    monkeypatch.setattr(blockchain, "_escrow_contract", lambda address: fake_contract)
+    blockchain._event_cache.clear()
+
+    events = blockchain._escrow_events("0x" + "d" * 64, escrow, receipt)
+
+    assert events == ({"args": {}},)
+    assert decoded == [matching]
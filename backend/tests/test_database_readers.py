@@ -0,0 +1,88 @@
+"""Reader connection pool regressions."""
+
+import sqlite3
+
+import pytest
+
+
+@pytest.mark.anyio
+async def test_reader_pool_reuses_read_only_connections(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "readers.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    try:
+        async with database.get_reader() as first:
+            pass
+        # Idle pooled readers must not block interpreter exit
+        assert first.daemon
+        with pytest.raises(sqlite3.OperationalError):
+            async with database.get_reader() as second:
+                assert second is first
+                await second.execute("DELETE FROM users")
+
+        # A borrow that raised is closed rather than returned to the pool
+        assert database._idle_readers == []
+
+        # Reads through the pool see rows committed by writer sessions
+        user_id = await database.create_user("reader@example.com", "hash")
+        assert (await database.get_user_auth_row("reader@example.com"))[0] == user_id
+    finally:
+        await database.close_db()
+
+
+@pytest.mark.anyio
+async def test_chat_history_returns_newest_turns_oldest_first(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "history.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+
+    try:
+        user_id = await database.create_user("history@example.com", "hash")
+        async with database.DatabaseSession() as session:
+            await session.execute("INSERT INTO chat_sessions (user_id) VALUES (?)", (user_id,))
+            session_id = session.lastrowid
+        await database.save_chat_exchange(session_id, "first", "reply one")
+        await database.save_chat_exchange(session_id, "second", "reply two")
+
+        history = await database.get_chat_history(session_id, limit=3)
+
+        assert [turn["content"] for turn in history] == ["reply one", "second", "reply two"]
+        assert history[0] == {"role": "assistant", "content": "reply one"}
+    finally:
+        await database.close_db()
+
+
+@pytest.mark.anyio
+async def test_transaction_lookups_are_cached_and_invalidated(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "transactions.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+
+    try:
+        user_id = await database.create_user("buyer@example.com", "hash")
+        tx_hash = "0x" + "e" * 64
+        await database.create_transaction(user_id, tx_hash, "purchase", "pending", idempotency_key="k1")
+
+        assert (await database.get_transaction_by_hash(tx_hash))["status"] == "pending"
+        assert (await database.get_transaction_by_idempotency_key("k1"))["tx_hash"] == tx_hash
+
+        # The combined lookup prefers the idempotency key row
+        other_hash = "0x" + "f" * 64
+        await database.create_transaction(user_id, other_hash, "purchase", "pending")
+        database.invalidate_transaction(tx_hash=tx_hash, idempotency_key="k1")
+        assert (await database.get_transaction_by_idempotency_key_or_hash("k1", other_hash))["tx_hash"] == tx_hash
+        assert (await database.get_transaction_by_idempotency_key_or_hash(None, other_hash))["tx_hash"] == other_hash
+        assert await database.get_transaction_by_idempotency_key_or_hash("k2", "0x" + "0" * 64) is None
+
+        await database.update_transaction_status(tx_hash, "confirmed")
+
+        assert (await database.get_transaction_by_hash(tx_hash))["status"] == "confirmed"
+        assert (await database.get_transaction_by_idempotency_key("k1"))["status"] == "confirmed"
+    finally:
+        await database.close_db()
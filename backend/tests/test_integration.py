@@ -79,7 +79,7 @@ def stub_commerce_agent(monkeypatch):
                 "cached": False,
             }
 
-        async def generate_product_image(self, prompt: str, style: str, aspect_ratio: str):
+        async def generate_product_image(self, prompt: str, style: str, aspect_ratio: str, user_id=None):
             return {
                 "image_url": "https://example.com/test.png",
                 "prompt": prompt,
@@ -202,7 +202,7 @@ def test_websocket_connection():
         headers={"Authorization": f"Bearer {token}"},
     ) as websocket:
         websocket.send_json({"type": "ping"})
-        message = websocket.receive_json()
+        message = websocket.receive_json(mode="binary")
         assert message["type"] in {"pong", "ping"}
 
 
@@ -215,7 +215,7 @@ def test_websocket_connection_with_auth_subprotocol():
         subprotocols=["arc.jwt", token],
     ) as websocket:
         websocket.send_json({"type": "ping"})
-        message = websocket.receive_json()
+        message = websocket.receive_json(mode="binary")
         assert message["type"] in {"pong", "ping"}
 
 
@@ -258,7 +258,7 @@ def test_websocket_streaming():
         websocket.send_json({"type": "message", "content": "Hello there"})
         received_done = False
         for _ in range(20):
-            message = websocket.receive_json()
+            message = websocket.receive_json(mode="binary")
             if message["type"] == "done":
                 received_done = True
                 break
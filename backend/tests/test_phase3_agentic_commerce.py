@@ -87,15 +87,18 @@ async def test_websocket_disconnect_cancels_inflight_agent_stream(monkeypatch):
         async def close(self, code=1000, reason=None):
             self.closed = (code, reason)
 
-        async def receive_json(self):
+        async def receive(self):
             self.receive_count += 1
             if self.receive_count == 1:
-                return {"type": "message", "content": "find a jacket", "context": {}}
+                return {
+                    "type": "websocket.receive",
+                    "text": '{"type": "message", "content": "find a jacket", "context": {}}',
+                }
             await stream_started.wait()
             raise WebSocketDisconnect(code=1000)
 
-        async def send_json(self, message):
-            self.sent.append(message)
+        async def send_bytes(self, payload):
+            self.sent.append(payload)
 
     async def fake_authenticate(websocket, path_user_id):
         return path_user_id, None
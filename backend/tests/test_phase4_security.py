@@ -74,3 +74,110 @@ async def test_transaction_verify_rejects_malformed_tx_hash_before_db_or_rpc(mon
 
     assert excinfo.value.status_code == 400
     assert "32-byte 0x-prefixed hex" in excinfo.value.detail
+
+
+@pytest.mark.anyio
+async def test_password_hashing_round_trips_off_the_event_loop():
+    from auth import get_jwt_auth
+
+    jwt_auth = get_jwt_auth()
+    hashed = await jwt_auth.hash_password("correct horse battery staple")
+
+    assert hashed != "correct horse battery staple"
+    assert await jwt_auth.verify_password("correct horse battery staple", hashed)
+    assert not await jwt_auth.verify_password("wrong password", hashed)
+
+
+def test_access_token_round_trips_and_rejects_wrong_type():
+    from auth import get_jwt_auth
+
+    jwt_auth = get_jwt_auth()
+    access_token = jwt_auth.create_access_token({"sub": "42"})
+    refresh_token = jwt_auth.create_refresh_token({"sub": "42"})
+
+    assert jwt_auth.get_subject_from_token(access_token) == "42"
+    assert jwt_auth.verify_token(refresh_token, token_type="access") is None
+    assert jwt_auth.verify_token(access_token + "x") is None
+
+
+def test_secure_tokens_are_unique_across_pool_refills():
+    import secrets
+
+    from auth import _random_pool, generate_api_key, generate_secure_token
+
+    tokens = {generate_secure_token() for _ in range(300)}
+
+    assert len(tokens) == 300
+    assert all(len(token) == len(secrets.token_urlsafe(32)) for token in tokens)
+    assert generate_api_key("pk").startswith("pk_")
+    assert len(_random_pool.take(10_000)) == 10_000
+
+
+@pytest.mark.anyio
+async def test_refresh_token_is_revoked_after_user_version_bump(monkeypatch, tmp_path):
+    from fastapi import HTTPException
+
+    import database
+    from auth import UserCreate, refresh_access_token, register_user
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "auth.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    tokens = await register_user(UserCreate(email="revoke@example.com", password="pw-123456"), None)
+    refreshed = await refresh_access_token(tokens.refresh_token, None)
+
+    user = await database.get_user_by_email("revoke@example.com")
+    await database.bump_user_version(user["id"])
+
+    with pytest.raises(HTTPException) as exc_info:
+        await refresh_access_token(refreshed.refresh_token, None)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_login_only_returns_tokens_for_the_right_password(monkeypatch, tmp_path):
+    from fastapi import HTTPException
+
+    import database
+    from auth import UserCreate, UserLogin, authenticate_user, get_jwt_auth, register_user
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "login.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    await register_user(UserCreate(email="login@example.com", password="pw-123456"), None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await authenticate_user(UserLogin(email="login@example.com", password="wrong-pw"), None)
+    assert exc_info.value.status_code == 401
+
+    tokens = await authenticate_user(UserLogin(email="login@example.com", password="pw-123456"), None)
+    assert get_jwt_auth().verify_token(tokens.access_token)["email"] == "login@example.com"
+
+
+def test_verified_tokens_are_cached_until_expiry(monkeypatch):
+    import auth
+    from datetime import timedelta
+
+    jwt_auth = auth.get_jwt_auth()
+    token = jwt_auth.create_access_token({"sub": "7"})
+    decodes = []
+    real_decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    first = jwt_auth.verify_token(token)
+    first["sub"] = "mutated"
+    assert jwt_auth.verify_token(token)["sub"] == "7"
+    assert jwt_auth.verify_token(token, token_type="refresh") is None
+    assert len(decodes) == 1
+
+    expired = jwt_auth.create_access_token({"sub": "7"}, expires_delta=timedelta(seconds=-1))
+    assert jwt_auth.verify_token(expired) is None
@@ -2,6 +2,7 @@
 
 from pathlib import Path
 
+import orjson
 import pytest
 
 
@@ -32,7 +33,7 @@ async def test_product_search_honors_sort_by_and_limit():
 
 
 @pytest.mark.anyio
-async def test_product_search_api_forwards_sort_by_and_limit(monkeypatch):
+async def test_product_search_api_forwards_sort_by_and_limit():
     import main
     from models.schemas import ProductSearch
 
@@ -54,15 +55,15 @@ async def test_product_search_api_forwards_sort_by_and_limit(monkeypatch):
                 }
             ]
 
-    monkeypatch.setattr(main, "commerce_agent", FakeAgent())
-
     result = await main.search_products(
-        ProductSearch(query="demo", sort_by="price_asc", limit=1)
+        ProductSearch(query="demo", sort_by="price_asc", limit=1),
+        {"sub": "1"},
+        FakeAgent(),
     )
 
     assert observed["sort_by"] == "price_asc"
     assert observed["limit"] == 1
-    assert len(result) == 1
+    assert [product["id"] for product in orjson.loads(result.body)] == ["demo_1"]
 
 
 @pytest.mark.anyio
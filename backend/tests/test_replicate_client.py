@@ -0,0 +1,42 @@
+"""Replicate client request-sharing regressions."""
+
+import asyncio
+
+import pytest
+
+from tools.replicate import CircuitBreaker, ReplicateClient
+
+
+def _initialized_client() -> ReplicateClient:
+    client = ReplicateClient()
+    client.client = object()
+    client.circuit_breaker = CircuitBreaker("test_replicate")
+    client._initialized = True
+    return client
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_generations_share_one_prediction(monkeypatch):
+    client = _initialized_client()
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_create_prediction(model, prompt, width, height):
+        calls.append(prompt)
+        await release.wait()
+        return {"image_url": "https://example.com/a.webp", "prompt": prompt, "style": "generated", "model": model}
+
+    monkeypatch.setattr(client, "_create_prediction", fake_create_prediction)
+
+    first = asyncio.create_task(client.generate_image("neon sneaker"))
+    second = asyncio.create_task(client.generate_image("neon sneaker"))
+    other = asyncio.create_task(client.generate_image("glass purse"))
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(first, second, other)
+
+    assert len(calls) == 2
+    assert results[0] == results[1]
+    assert results[0] is not results[1]
+    assert client._pending_generations == {}
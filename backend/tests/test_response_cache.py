@@ -0,0 +1,92 @@
+"""Response cache regressions for the commerce agent."""
+
+import pytest
+
+from cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used_entry():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    import cache as cache_module
+
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    cache = TTLCache(max_entries=4, ttl_seconds=10)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    now[0] += 11
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_disabled_ttl_cache_stores_nothing():
+    cache = TTLCache(max_entries=0, ttl_seconds=60)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+
+
+@pytest.mark.anyio
+async def test_process_message_reuses_cached_response_for_rephrased_message(monkeypatch):
+    from agent import CommerceAgent
+
+    agent = CommerceAgent()
+    agent.client = object()
+    calls = []
+
+    async def fake_call_llm(messages, context):
+        calls.append(messages)
+        return {
+            "message": "Here is a jacket.",
+            "actions": [],
+            "products": [{"id": "jacket_1"}],
+            "images": [],
+        }
+
+    monkeypatch.setattr(agent, "_call_llm", fake_call_llm)
+
+    first = await agent.process_message("Show me a cyberpunk jacket", user_id="1")
+    first["products"].append({"id": "mutated"})
+    second = await agent.process_message("cyberpunk jacket, please!", user_id="1")
+
+    assert len(calls) == 1
+    # Hits are deep copies, so the caller's mutation did not leak into the cache
+    assert second["products"] == [{"id": "jacket_1"}]
+
+    # Other users and other request contexts never see this user's entry
+    await agent.process_message("cyberpunk jacket, please!", user_id="2")
+    await agent.process_message("cyberpunk jacket, please!", user_id="1", context={"budget": 50})
+    assert len(calls) == 3
+
+
+@pytest.mark.anyio
+async def test_process_message_does_not_cache_llm_errors(monkeypatch):
+    from agent import LLM_ERROR_MESSAGE, CommerceAgent
+
+    agent = CommerceAgent()
+    agent.client = object()
+    calls = []
+
+    async def failing_call_llm(messages, context):
+        calls.append(messages)
+        return {"message": LLM_ERROR_MESSAGE, "actions": [], "products": [], "images": []}
+
+    monkeypatch.setattr(agent, "_call_llm", failing_call_llm)
+
+    await agent.process_message("neon sneakers", user_id="1")
+    await agent.process_message("neon sneakers", user_id="1")
+
+    assert len(calls) == 2
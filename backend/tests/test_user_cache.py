@@ -0,0 +1,68 @@
+"""User lookup cache regressions."""
+
+import pytest
+
+
+@pytest.mark.anyio
+async def test_user_lookups_are_cached_and_invalidated(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "users.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    user_id = await database.create_user("cache@example.com", "hash")
+    user = await database.get_user_by_email("cache@example.com")
+    assert user["id"] == user_id
+
+    # A cached copy is served without touching SQLite, and mutating it is harmless
+    user["email"] = "mutated@example.com"
+    async with database.DatabaseSession() as session:
+        await session.execute("UPDATE users SET hashed_password = ? WHERE id = ?", ("new", user_id))
+    assert (await database.get_user_by_id(user_id))["hashed_password"] == "hash"
+    assert (await database.get_user_by_id(user_id))["email"] == "cache@example.com"
+
+    database.invalidate_user(email="cache@example.com", user_id=user_id)
+    assert (await database.get_user_by_email("cache@example.com"))["hashed_password"] == "new"
+
+
+@pytest.mark.anyio
+async def test_email_lookups_ignore_case_and_whitespace(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "emails.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    # A row stored before normalization keeps its original casing
+    async with database.DatabaseSession() as session:
+        await session.execute(
+            "INSERT INTO users (email, hashed_password) VALUES (?, ?)", ("Legacy@Example.com", "hash")
+        )
+
+    assert (await database.get_user_auth_row(" legacy@example.COM "))[1] == "Legacy@Example.com"
+    assert await database.create_user("LEGACY@example.com", "hash") is None
+
+    user_id = await database.create_user("  New@Example.com", "hash")
+    assert (await database.get_user_by_email("new@example.com"))["id"] == user_id
+    assert (await database.get_user_by_id(user_id))["email"] == "new@example.com"
+
+
+@pytest.mark.anyio
+async def test_login_lookup_warms_the_user_cache(monkeypatch, tmp_path):
+    import database
+
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "login.db"))
+    monkeypatch.setattr(database, "_db_initialized", False)
+    database._users_by_email.clear()
+    database._users_by_id.clear()
+
+    user_id = await database.create_user("login@example.com", "hash")
+    assert (await database.get_user_auth_row("login@example.com"))[:3] == (
+        user_id, "login@example.com", "hash"
+    )
+    assert database._users_by_email.get("login@example.com")["id"] == user_id
+    assert database._users_by_id.get(user_id)["email"] == "login@example.com"
+    assert await database.get_user_auth_row("missing@example.com") is None
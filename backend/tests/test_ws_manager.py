@@ -0,0 +1,97 @@
+"""WebSocket connection manager fan-out regressions."""
+
+import asyncio
+import json
+
+import pytest
+
+
+class _FakeSocket:
+    def __init__(self, fail: bool = False, gate: asyncio.Event = None):
+        self.fail = fail
+        self.gate = gate
+        self.sent = []
+
+    async def send_bytes(self, payload):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.sent.append(json.loads(payload))
+
+
+@pytest.mark.anyio
+async def test_broadcast_is_concurrent_and_drops_failed_sockets():
+    from main import ConnectionManager
+
+    manager = ConnectionManager()
+    gate = asyncio.Event()
+    slow, healthy, broken = _FakeSocket(gate=gate), _FakeSocket(), _FakeSocket(fail=True)
+    manager._connections.update({"slow": slow, "healthy": healthy, "broken": broken})
+
+    broadcast = asyncio.create_task(manager.broadcast({"type": "ping"}))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    # The healthy socket is not held up behind the slow one
+    assert healthy.sent == [{"type": "ping"}]
+    gate.set()
+    await broadcast
+
+    assert slow.sent == [{"type": "ping"}]
+    assert "broken" not in manager._connections
+
+    manager._connections["closed"] = _FakeSocket(fail=True)
+    manager._user_connections["u1"] = {"healthy": None, "closed": None}
+    await manager.send_to_user("u1", {"type": "note"})
+    assert healthy.sent[-1] == {"type": "note"}
+    assert list(manager._user_connections["u1"]) == ["healthy"]
+
+
+@pytest.mark.anyio
+async def test_shared_heartbeat_pings_every_connection():
+    from main import ConnectionManager, _heartbeat
+
+    manager = ConnectionManager()
+    healthy, broken = _FakeSocket(), _FakeSocket(fail=True)
+    manager._connections.update({"healthy": healthy, "broken": broken})
+
+    heartbeat = asyncio.create_task(_heartbeat(manager, interval=0))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    heartbeat.cancel()
+
+    assert healthy.sent and all(message == {"type": "ping"} for message in healthy.sent)
+    assert "broken" not in manager._connections
+
+
+def test_ws_messages_encode_wide_integers():
+    from main import _encode_ws_done, _encode_ws_message, _encode_ws_text
+
+    assert _encode_ws_message({"type": "chunk", "content": "hé"}) == '{"type":"chunk","content":"hé"}'.encode()
+    assert json.loads(_encode_ws_message({"amount": 10**30})) == {"amount": 10**30}
+    assert _encode_ws_text("hé \"x\"") == _encode_ws_message({"type": "text", "content": "hé \"x\""})
+    assert _encode_ws_done("a\nb") == _encode_ws_message({"type": "done", "message": "a\nb"})
+
+
+@pytest.mark.anyio
+async def test_outbox_merges_backed_up_text_frames_in_order():
+    from main import _OUTBOX_END, _drain_ws_outbox
+
+    socket = _FakeSocket()
+    outbox = asyncio.Queue()
+    for message in (
+        "Hel",
+        "lo",
+        {"type": "tool_start", "tool": "search_products"},
+        '"quoted"',
+        _OUTBOX_END,
+    ):
+        outbox.put_nowait(message)
+
+    await _drain_ws_outbox(socket, outbox)
+
+    assert socket.sent == [
+        {"type": "text", "content": "Hello"},
+        {"type": "tool_start", "tool": "search_products"},
+        {"type": "text", "content": '"quoted"'},
+    ]
@@ -112,6 +112,8 @@ export function useWebSocket(options: UseWebSocketOptions): UseWebSocketReturn {
 
     try {
       const ws = protocols ? new WebSocket(url, protocols) : new WebSocket(url);
+      // The backend sends UTF-8 JSON in binary frames
+      ws.binaryType = 'arraybuffer';
 
       ws.onopen = () => {
         if (isMountedRef.current) {
@@ -155,7 +157,11 @@ export function useWebSocket(options: UseWebSocketOptions): UseWebSocketReturn {
       ws.onmessage = (event) => {
         if (isMountedRef.current) {
           try {
-            const message: WebSocketMessage = JSON.parse(event.data);
+            const data =
+              typeof event.data === 'string'
+                ? event.data
+                : new TextDecoder().decode(event.data);
+            const message: WebSocketMessage = JSON.parse(data);
             setLastMessage(message);
             if (message.type === 'ping') {
               ws.send(JSON.stringify({ type: 'pong' }));
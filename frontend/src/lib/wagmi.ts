@@ -2,7 +2,7 @@ import { QueryClient } from '@tanstack/react-query';
 import { createAppKit } from '@reown/appkit';
 import { WagmiAdapter } from '@reown/appkit-adapter-wagmi';
 import type { AppKitNetwork } from '@reown/appkit-common';
-import { createConfig, http } from 'wagmi';
+import { createConfig, fallback, http, webSocket } from 'wagmi';
 import { injected, walletConnect } from 'wagmi/connectors';
 import { defineChain } from 'viem';
 
@@ -11,6 +11,9 @@ const ARC_RPC_URL =
   process.env.NEXT_PUBLIC_ARC_RPC_URL ||
   process.env.NEXT_PUBLIC_ARC_RPC ||
   'https://rpc.testnet.arc.network';
+// Optional: with a WebSocket endpoint, receipt waits follow new blocks over
+// eth_subscribe instead of polling eth_getTransactionReceipt
+const ARC_WS_RPC_URL = process.env.NEXT_PUBLIC_ARC_WS_RPC_URL || '';
 const ARC_EXPLORER_URL =
   process.env.NEXT_PUBLIC_ARC_EXPLORER_URL || 'https://testnet.arcscan.app';
 
@@ -24,7 +27,10 @@ export const arcTestnet = defineChain({
     decimals: 18,
   },
   rpcUrls: {
-    default: { http: [ARC_RPC_URL] },
+    default: {
+      http: [ARC_RPC_URL],
+      ...(ARC_WS_RPC_URL ? { webSocket: [ARC_WS_RPC_URL] } : {}),
+    },
     public: { http: [ARC_RPC_URL] },
   },
   blockExplorers: {
@@ -54,11 +60,17 @@ const wagmiConnectors = [
     : []),
 ];
 
+// Concurrent reads (allowance, gas estimate, receipt polls) share one
+// JSON-RPC batch POST instead of a round-trip each
+const arcHttpTransport = http(ARC_RPC_URL, { batch: true });
+
 export const wagmiConfig = createConfig({
   chains: [arcTestnet],
   connectors: wagmiConnectors,
   transports: {
-    [arcTestnet.id]: http(ARC_RPC_URL),
+    [arcTestnet.id]: ARC_WS_RPC_URL
+      ? fallback([webSocket(ARC_WS_RPC_URL), arcHttpTransport])
+      : arcHttpTransport,
   },
 });
 